@@ -0,0 +1,92 @@
+import numpy as np
+
+
+def alias_table(weights):
+    #Walker/Vose alias table for weights: column i is kept with probability
+    #prob[i] and replaced by alias[i] otherwise.
+    weights = np.asarray(weights, dtype=float)
+    n = len(weights)
+    total = weights.sum()
+    prob = np.ones(n)
+    alias = np.arange(n)
+    if total <= 0:
+        return prob, alias
+    scaled = weights * n / total
+    small = [i for i in xrange(n) if scaled[i] < 1.]
+    large = [i for i in xrange(n) if scaled[i] >= 1.]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1. - scaled[s]
+        if scaled[l] < 1.:
+            small.append(l)
+        else:
+            large.append(l)
+    #whatever is left is 1 up to rounding
+    for i in small + large:
+        prob[i] = 1.
+    return prob, alias
+
+def lookup(prob, alias, u):
+    #One uniform per sample picks both the column and the coin flip
+    n = prob.shape[-1]
+    u = u * n
+    column = np.minimum(u.astype(np.intp), n - 1)
+    return column, u - column
+
+
+class XformSelector(object):
+    #O(1) weighted choice of the next xform. There's one alias table for the
+    #plain weights and one per chaos row, all rebuilt whenever a weight or
+    #chaos value of the flame changes.
+    def __init__(self, flame):
+        self.flame = flame
+        self._signature = None
+        self.refresh()
+
+    def signature(self):
+        xforms = self.flame.xforms
+        return (tuple(float(getattr(xform, 'weight', 1.)) for xform in xforms),
+                tuple(tuple(xform.chaos.value) if xform.chaos else None
+                      for xform in xforms))
+
+    def refresh(self):
+        signature = self.signature()
+        if signature == self._signature:
+            return
+        self._signature = signature
+        weights, chaos = signature
+        n = len(weights)
+        weights = np.array(weights)
+        self.prob, self.alias = alias_table(weights)
+        #row j is used after xform j
+        self.row_prob = np.empty((n, n))
+        self.row_alias = np.empty((n, n), dtype=np.intp)
+        for j, row in enumerate(chaos):
+            multipliers = np.ones(n)
+            if row is not None:
+                multipliers[:min(n, len(row))] = row[:n]
+            row_weights = weights * multipliers
+            if row_weights.sum() <= 0:
+                row_weights = weights
+            self.row_prob[j], self.row_alias[j] = alias_table(row_weights)
+
+    def first(self, u):
+        #Xforms for points that haven't been through one yet
+        self.refresh()
+        column, coin = lookup(self.prob, self.alias, u)
+        return np.where(coin < self.prob[column], column, self.alias[column])
+
+    def next(self, current, u):
+        #Xforms following current, a vector of xform indices, -1 for none
+        self.refresh()
+        fresh = current < 0
+        row = np.where(fresh, 0, current)
+        column, coin = lookup(self.row_prob, self.row_alias, u)
+        rtn = np.where(coin < self.row_prob[row, column], column,
+                       self.row_alias[row, column])
+        if fresh.any():
+            rtn[fresh] = self.first(u[fresh])
+        return rtn
@@ -0,0 +1,109 @@
+import json
+import struct
+import numpy as np
+import xml.etree.cElementTree as ET
+
+from flame import Flame
+from utils import NFRAMES
+
+#An animation file is MAGIC, the length of a JSON header as a little endian
+#uint32, the header, padding up to a multiple of 8 bytes and then a
+#frames x parameters array of little endian float64 that can be memmapped.
+#The header holds the flame itself, LFOs and all, and which xform value each
+#column of the array is. Everything that doesn't change between frames is
+#only stored once, in the flame.
+MAGIC = 'FLAMLFO\x01'
+DTYPE = '<f8'
+#coefs and post take 6 columns, every other value 1
+WIDTHS = {'coefs': 6, 'post': 6}
+
+
+def layout(flame):
+    #(xform index, name) of every value XformPlan.get_at computes for flame
+    rtn = []
+    for j, xform in enumerate(flame.plan.xforms):
+        names = set(xform.bases)
+        if xform.animate or xform.angles:
+            names.add('coefs')
+        #angles are (function, freq, amp, phase, group, axes)
+        if xform.post is not None or any(angle[4] == 1
+                                         for angle in xform.angles):
+            names.add('post')
+        rtn.extend((j, name) for name in sorted(names))
+    return rtn
+
+def write(flame, filename, nframes=NFRAMES):
+    #Stores the loop utils.frame_at would produce for flame
+    columns = layout(flame)
+    widths = [WIDTHS.get(name, 1) for j, name in columns]
+    data = np.empty((nframes, sum(widths)), dtype=DTYPE)
+    for n in xrange(nframes):
+        frame = flame.plan.get_at(n/float(nframes), rotate=360.*(n+1)/nframes)
+        k = 0
+        for (j, name), width in zip(columns, widths):
+            #a post only some frames have is nan in the others
+            data[n, k:k + width] = frame[j].get(name, np.nan)
+            k += width
+    header = json.dumps({
+            'flame': flame.to_string(),
+            'nframes': nframes,
+            'layout': columns,
+            })
+    start = len(MAGIC) + 4 + len(header)
+    padding = -start % 8
+    with open(filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header) + padding))
+        f.write(header + ' ' * padding)
+        data.tofile(f)
+
+
+class Animation(object):
+    #Random access to the frames of an animation file. The frames array is
+    #memmapped, so only the frames asked for are ever read.
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('{0} is not an animation'.format(filename))
+            size, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(size))
+        self.flame = Flame(ET.fromstring(header['flame']))
+        self.nframes = header['nframes']
+        self.layout = [(j, str(name)) for j, name in header['layout']]
+        widths = [WIDTHS.get(name, 1) for j, name in self.layout]
+        self.frames = np.memmap(filename, dtype=DTYPE, mode='r',
+                                offset=len(MAGIC) + 4 + size,
+                                shape=(self.nframes, sum(widths)))
+        #(xform index, name, first column, last column)
+        self._columns = []
+        k = 0
+        for (j, name), width in zip(self.layout, widths):
+            self._columns.append((j, name, k, k + width))
+            k += width
+
+    def __len__(self):
+        return self.nframes
+
+    def values_at(self, n):
+        #The per xform values dicts of frame n, as XformPlan.get_at gives
+        row = self.frames[n].tolist()
+        rtn = [{} for xform in self.flame.xforms]
+        for j, name, first, last in self._columns:
+            if last - first == 1:
+                rtn[j][name] = row[first]
+            elif row[first] == row[first]:
+                rtn[j][name] = tuple(row[first:last])
+        return rtn
+
+    def string_at(self, n):
+        return self.flame.plan.write(self.values_at(n))
+
+    def element_at(self, n):
+        return ET.fromstring(self.string_at(n))
+
+    def flame_at(self, n):
+        return Flame(self.element_at(n))
+
+    def iter_strings(self):
+        for n in xrange(self.nframes):
+            yield self.string_at(n)
@@ -0,0 +1,219 @@
+#Benchmarks for parsing, animating, serializing and palette handling.
+#
+#    python bench.py -o new.json
+#    python bench.py -o new.json --compare old.json --threshold 0.1
+#
+#Every case runs in a fresh interpreter, on genomes written to a file before
+#it starts, so its peak memory (ru_maxrss) is that of its own work. With
+#--compare the exit status is 1 if any case got slower or bigger by more than
+#the threshold.
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.cElementTree as ET
+
+from flame import Flames, Flame, LFO, format_value
+from plan import ROTATIONS
+from utils import frame_at, print_loop
+from variations import variation_list
+
+#(name, kind, parameters of the synthetic genomes and the workload)
+CASES = (
+        ('parse', 'parse', dict(xforms=5, lfos=2, colors=256, flames=50)),
+        ('parse_large', 'parse', dict(xforms=20, lfos=4, colors=256,
+                                      flames=20)),
+        ('iterparse', 'iterparse', dict(xforms=5, lfos=2, colors=256,
+                                        flames=50)),
+        ('animate', 'animate', dict(xforms=5, lfos=2, colors=256,
+                                    frames=100)),
+        ('animate_lfos', 'animate', dict(xforms=20, lfos=8, colors=256,
+                                         frames=100)),
+        ('serialize', 'serialize', dict(xforms=20, lfos=4, colors=256,
+                                        flames=50)),
+        ('loop', 'loop', dict(xforms=5, lfos=2, colors=256, frames=300)),
+        ('loop_sparse', 'loop', dict(xforms=3, lfos=1, colors=16,
+                                     frames=300)),
+        ('palette', 'palette', dict(colors=256, flames=200)),
+        )
+#times each case is timed, the best one counts
+REPEAT = 3
+#allowed fractional loss of throughput or gain of memory
+THRESHOLD = 0.1
+
+
+def make_flame(xforms=3, lfos=1, colors=256, seed=0):
+    #A random but reproducible <flame> element with xforms xforms, lfos LFOs
+    #on each and colors palette entries
+    rng = random.Random(seed)
+    element = ET.Element('flame', {
+            'name': 'bench{0}'.format(seed),
+            'size': '640 480',
+            'center': format_value([rng.uniform(-1, 1), rng.uniform(-1, 1)]),
+            'scale': '160',
+            'brightness': '4',
+            'gamma': '4',
+            })
+    targets = sorted(ROTATIONS) + ['weight', 'color', 'opacity']
+    for j in xrange(xforms):
+        xform = ET.SubElement(element, 'xform', {
+                'weight': format_value(round(rng.uniform(0.1, 1.), 4)),
+                'color': format_value(round(rng.random(), 4)),
+                'coefs': format_value([round(rng.uniform(-1, 1), 4)
+                                       for k in xrange(6)]),
+                })
+        names = rng.sample(variation_list, 2)
+        for name in names:
+            xform.set(name, format_value(round(rng.uniform(0.1, 1.), 4)))
+        for k in xrange(lfos):
+            ET.SubElement(xform, 'lfo', {
+                    'target': rng.choice(targets + names),
+                    'shape': rng.choice(LFO._shapes),
+                    'freq': str(rng.randint(1, 3)),
+                    'amp': format_value(round(rng.uniform(0.1, 10.), 4)),
+                    'phase': format_value(round(rng.random(), 4)),
+                    })
+    for k in xrange(colors):
+        ET.SubElement(element, 'color', {
+                'index': str(k * 256 // colors),
+                'rgb': format_value([rng.randint(0, 255) for c in xrange(3)]),
+                })
+    return element
+
+def make_flames(flames=10, seed=0, **kwargs):
+    element = ET.Element('flames')
+    element.extend(make_flame(seed=seed + k, **kwargs)
+                   for k in xrange(flames))
+    return element
+
+def make_fixture(kind, params):
+    #Writes the genomes a case works on to a temporary file and returns its
+    #path. run does this before starting the case, so generating them isn't
+    #part of the case's peak memory.
+    params = dict(params)
+    params.pop('frames', None)
+    count = params.pop('flames', 1)
+    if kind == 'palette':
+        params.update(xforms=1, lfos=0)
+    fd, path = tempfile.mkstemp(suffix='.flame')
+    with os.fdopen(fd, 'w') as f:
+        f.write(ET.tostring(make_flames(count, **params)))
+    return path
+
+def run_case(kind, params, path, repeat=REPEAT):
+    #Times one case in this process on the genomes make_fixture wrote to
+    #path, returns its throughput
+    nframes = params.get('frames', 1)
+    count = params.get('flames', 1)
+    if kind == 'parse':
+        work = lambda: Flames(filename=path)
+        units, unit = count, 'flames'
+    elif kind == 'iterparse':
+        work = lambda: list(Flames.iterparse(path))
+        units, unit = count, 'flames'
+    elif kind == 'animate':
+        flame = Flame(ET.parse(path).getroot()[0])
+        work = lambda: [frame_at(flame, n, nframes) for n in xrange(nframes)]
+        units, unit = nframes, 'frames'
+    elif kind == 'serialize':
+        flames = [Flame(element) for element in ET.parse(path).getroot()]
+        work = lambda: [ET.tostring(flame.to_element()) for flame in flames]
+        units, unit = count, 'flames'
+    elif kind == 'loop':
+        flame = Flame(ET.parse(path).getroot()[0])
+        work = lambda: print_loop(flame, nframes)
+        units, unit = nframes, 'frames'
+    elif kind == 'palette':
+        palettes = [Flame(element).palette
+                    for element in ET.parse(path).getroot()]
+        def work():
+            for a, b in zip(palettes, palettes[1:] + palettes[:1]):
+                a.rotate_hue(0.1)
+                a.blend(b, 0.5).to_elements()
+        units, unit = count, 'palettes'
+    else:
+        raise ValueError('Unknown benchmark kind {0}'.format(kind))
+    best = None
+    for r in xrange(repeat):
+        start = time.time()
+        work()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return {
+            'unit': unit,
+            'seconds': best,
+            'rate': units / max(best, 1e-9),
+            #kilobytes on linux
+            'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            }
+
+def run(cases=CASES, repeat=REPEAT):
+    #Runs every case in its own interpreter, returns name -> result
+    results = {}
+    for name, kind, params in cases:
+        path = make_fixture(kind, params)
+        try:
+            output = subprocess.check_output(
+                    [sys.executable, os.path.abspath(__file__), '--run',
+                     json.dumps([kind, params, path, repeat])],
+                    cwd=os.path.dirname(os.path.abspath(__file__)))
+        finally:
+            os.remove(path)
+        results[name] = dict(json.loads(output), kind=kind, params=params)
+    return results
+
+def compare(old, new, threshold=THRESHOLD):
+    #Cases in both runs that lost more than threshold of their throughput or
+    #gained more than threshold in peak memory, as (name, what, old, new)
+    regressions = []
+    for name in sorted(set(old) & set(new)):
+        a, b = old[name], new[name]
+        if b['rate'] < a['rate'] * (1. - threshold):
+            regressions.append((name, 'rate', a['rate'], b['rate']))
+        if b['maxrss'] > a['maxrss'] * (1. + threshold):
+            regressions.append((name, 'maxrss', a['maxrss'], b['maxrss']))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description='Benchmarks parsing, animating and serializing flames')
+    parser.add_argument('-o', '--output', help='save results as JSON')
+    parser.add_argument('--compare', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--case', action='append',
+                        help='only run this case, can be repeated')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.run:
+        kind, params, path, repeat = json.loads(args.run)
+        print json.dumps(run_case(kind, params, path, repeat))
+        return 0
+    cases = [case for case in CASES if not args.case or case[0] in args.case]
+    results = run(cases, args.repeat)
+    for name, kind, params in cases:
+        result = results[name]
+        print '{0:<14} {1:>12.1f} {2}/s {3:>8} KB'.format(
+                name, result['rate'], result['unit'], result['maxrss'])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        regressions = compare(old, results, args.threshold)
+        for name, what, a, b in regressions:
+            print 'REGRESSION {0} {1}: {2:.1f} -> {3:.1f}'.format(
+                    name, what, a, b)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
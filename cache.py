@@ -0,0 +1,95 @@
+import hashlib
+import os
+import tempfile
+
+#default size cap of a FrameCache, in bytes
+MAX_BYTES = 2**30
+
+
+class FrameCache(object):
+    #Serialized frames on disk, keyed by a sha1 of everything that goes into
+    #them: the flame's static attributes, xforms and palette and the values
+    #its LFOs give at that time. Editing one LFO only changes the keys of
+    #the frames it actually changes. Hits bump the file's mtime and the
+    #least recently used frames are deleted once the cache is over max_bytes.
+    def __init__(self, directory, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        #total size of the cache, counted when first needed
+        self._size = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, plan, values):
+        sha = hashlib.sha1(plan.digest())
+        sha.update(repr([sorted(v.items()) for v in values]))
+        return sha.hexdigest()
+
+    def string_at(self, flame, i, rotate=0.):
+        #flame.string_at(i, rotate), from the cache if it's there
+        plan = flame.plan
+        values = plan.get_at(i, rotate)
+        path = os.path.join(self.directory, self.key(plan, values))
+        try:
+            with open(path, 'rb') as f:
+                rtn = f.read()
+            os.utime(path, None)
+            return rtn
+        except (IOError, OSError):
+            pass
+        rtn = plan.write(values)
+        self._put(path, rtn)
+        return rtn
+
+    def size(self):
+        if self._size is None:
+            self._size = sum(size for mtime, size, path in self._entries())
+        return self._size
+
+    def clear(self):
+        for mtime, size, path in self._entries():
+            self._remove(path)
+        self._size = 0
+
+    def _put(self, path, data):
+        #written to a temporary file first so readers never see part of one
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmp, path)
+        self._size = self.size() + len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        #Deletes least recently used frames until the cache fits in
+        #max_bytes. Other processes using the same directory are only seen
+        #here, so the size is recounted.
+        entries = sorted(self._entries())
+        self._size = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            if self._remove(path):
+                self._size -= size
+
+    def _entries(self):
+        #(mtime, size, path) of every cached frame
+        rtn = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            rtn.append((stat.st_mtime, stat.st_size, path))
+        return rtn
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,64 @@
+import multiprocessing
+import subprocess
+from concurrent import futures
+
+from utils import NFRAMES, frame_string
+
+#times a frame is tried again after its renderer fails
+RETRIES = 2
+
+
+def dispatch(frames, command, workers=None, inflight=None, retries=RETRIES):
+    #Feeds each of frames, serialized flames, to its own run of command on
+    #stdin and yields what they write to stdout, in frame order. workers runs
+    #go at once, one per cpu by default. frames is only pulled from while
+    #fewer than inflight frames (2 * workers by default) are being rendered
+    #or waiting for an earlier one, so a lazy generator is never far ahead.
+    #'{n}' in command is replaced by the frame number. A frame that still
+    #fails after retries raises subprocess.CalledProcessError.
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if inflight is None:
+        inflight = 2 * workers
+    inflight = max(inflight, 1)
+    frames = iter(frames)
+    pending = {}
+    n = 0
+    done = 0
+    executor = futures.ThreadPoolExecutor(workers)
+    try:
+        while True:
+            while len(pending) < inflight:
+                try:
+                    frame = next(frames)
+                except StopIteration:
+                    break
+                argv = [arg.replace('{n}', str(n)) for arg in command]
+                pending[n] = executor.submit(_render, argv, frame, retries)
+                n += 1
+            if not pending:
+                return
+            futures.wait([pending[done]])
+            while done in pending and pending[done].done():
+                yield pending.pop(done).result()
+                done += 1
+    finally:
+        for future in pending.itervalues():
+            future.cancel()
+        executor.shutdown(wait=True)
+
+def dispatch_loop(flame, command, nframes=NFRAMES, **kwargs):
+    #dispatch for the frames of flame's loop, generated as they're needed
+    frames = (frame_string(flame, n, nframes) for n in xrange(nframes))
+    return dispatch(frames, command, **kwargs)
+
+def _render(argv, frame, retries):
+    for attempt in xrange(retries + 1):
+        process = subprocess.Popen(argv, stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        output, error = process.communicate(frame)
+        if process.returncode == 0:
+            return output
+    raise subprocess.CalledProcessError(process.returncode, argv,
+                                        output + error)
@@ -1,18 +1,23 @@
-from variations import variation_list, variable_list
+from variations import variations, variation_list, variable_list
 import lfos
-from utils import polar, rect
-import colorsys, itertools, operator
+from plan import AnimationPlan, XformPlan, ROTATIONS
+from table import XformTable
+from utils import polar, rect, rect_array, rgb_to_hsv, hsv_to_rgb
+import writer
+from writer import format_value
+import colorsys, itertools
+import numpy as np
 import xml.etree.cElementTree as ET
 
 
 class Flames(object):
     def __init__(self, element=None, filename=None):
         self.flames = []
-        if operator.xor(element, filename):
+        if (element is None) == (filename is None):
             raise ValueError('Need element or filename, not both or neither')
-        if element:
+        if element is not None:
             self.from_element(element)
-        elif filename:
+        else:
             self.from_file(filename)
 
     def from_element(self, element):
@@ -31,6 +36,21 @@ class Flames(object):
         with open(filename, 'r') as f:
             self.from_string(f.read())
 
+    @staticmethod
+    def iterparse(filename):
+        #Yields the flames in filename one at a time. Each <flame> is cleared
+        #once it's been parsed, so only one is ever held in memory.
+        root = None
+        for event, element in ET.iterparse(filename, events=('start', 'end')):
+            if root is None:
+                root = element
+                if root.tag not in ('flames', 'flame'):
+                    raise ValueError('Needs to be in <flames> or <flame>')
+            elif event == 'end' and element.tag == 'flame':
+                yield Flame(element)
+                element.clear()
+                root.clear()
+
     def iter_flames(self):
         for flame in self.flames:
             yield flame
@@ -41,7 +61,7 @@ class Flames(object):
         return element
 
     def to_string(self):
-        return ET.tostring(self.to_element())
+        return writer.flames_string(self)
 
     def to_file(self, filename):
         with open(filename, 'w') as f:
@@ -61,6 +81,9 @@ class Flame(object):
             'width',
             'height',
             '_numx',
+            '_plan',
+            '_dirty',
+            '_static',
             )
     _defaults = {
             'name': 'none',
@@ -86,12 +109,13 @@ class Flame(object):
     def __init__(self, element=None):
         self.xforms = []
         self.final = None
-        if element:
+        self._plan = None
+        if element is not None:
             self.from_element(element)
         else:
             for k, v in self._defaults.items():
                 setattr(self, k, v)
-            self.palette = Palette()
+            self.palette = Palette(self)
 
     def from_element(self, element):
         for k, v in element.items():
@@ -124,51 +148,96 @@ class Flame(object):
         element = ET.Element('flame')
         #attributes
         for k, v in self._iter_attributes():
-            if isinstance(v, basestring):
-                pass
-            elif hasattr(v, "__iter__"):
-                #For tuple and list elements, make a space-delimited string
-                v = " ".join(str(i if i % 1 else int(i)) for i in v)
-            else:
-                #TODO: Might want to round here to truncate float precision errors
-                v = v if v % 1 else int(v)
-            element.set(k, v)
+            element.set(k, format_value(v))
         #xforms
-        element.extend(xform.to_string() for xform in self.xforms)
+        element.extend(xform.to_element() for xform in self.xforms)
         #finalxform
         if self.final:
-            element.apend(self.final.to_string())
+            element.append(self.final.to_element())
         #colors
-        element.append(self.palette.to_string())
+        element.extend(self.palette.to_elements())
         return element
 
     def to_string(self):
-        return ET.tostring(self.to_element())
+        return writer.flame_string(self)
 
-    def get_at(self, i):
-        #TODO: Refactor as this is basically to_element
-        element = ET.Element('flame')
-        for k, v in self._iter_attributes():
-            if isinstance(v, basestring):
-                pass
-            elif hasattr(v, "__iter__"):
-                v = " ".join(str(i if i % 1 else int(i)) for i in v)
-            else:
-                v = v if v % 1 else int(v)
-            element.set(k, v)
-        element.extend(xform.get_at(i) for xform in self.xforms)
-        if self.final != None:
-            element.apend(self.final.to_string())
-        element.append(self.palette.to_string())
+    def compile(self, memoize=False):
+        #Resolves every LFO to its parameter slot once. Edits made after
+        #that are picked up by plan, which only rebuilds what they touched.
+        #memoize keeps every xform's serialized frames, so a re-export after
+        #an edit only rewrites the xforms it touched.
+        self._plan = AnimationPlan(self, memoize)
+        return self._plan
+
+    @property
+    def plan(self):
+        if self._plan is None:
+            self.compile()
+        elif self.__dict__.get('_dirty') or self._plan.stale():
+            self._plan.refresh()
+        return self._plan
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name[0] != '_':
+            self._touch(static=True)
+
+    def __delattr__(self, name):
+        object.__delattr__(self, name)
+        if name[0] != '_':
+            self._touch(static=True)
+
+    def _touch(self, static=False):
+        #Something the plan was built from was edited. static is for the
+        #flame's own attributes and palette, as opposed to its xforms.
+        self.__dict__['_dirty'] = True
+        if static:
+            self.__dict__['_static'] = True
+
+    def get_at(self, i, rotate=0.):
+        #rotate is added, in degrees, to every xform that animates
+        plan = self.plan
+        element = ET.Element('flame', plan.attrib)
+        for xform, values in itertools.izip(self.xforms, plan.get_at(i, rotate)):
+            element.append(xform.to_element(print_lfos=False, values=values))
+        if plan.final is not None:
+            element.append(plan.final)
+        element.extend(plan.colors)
         return element
 
+    def string_at(self, i, rotate=0.):
+        #ET.tostring(self.get_at(i, rotate)) without building the element
+        return self.plan.string_at(i, rotate)
+
     def copy(self):
-        return Flame(ET.fromstring(self.to_string()))
+        #Clones share attribute values, chaos and the palette array with the
+        #original, the palette is only copied when a color is changed. Until
+        #then the array is read-only in both, set colors or assign array.
+        rtn = Flame.__new__(Flame)
+        state = rtn.__dict__
+        for k, v in self.__dict__.iteritems():
+            state[k] = list(v) if type(v) is list else v
+        state['_plan'] = None
+        state['_dirty'] = True
+        state['xforms'] = [xform._clone(rtn) for xform in self.xforms]
+        if self.final is not None:
+            state['final'] = self.final._clone(rtn)
+        state['palette'] = self.palette._clone(rtn)
+        return rtn
 
     def iter_xforms(self):
         for xform in self.xforms:
             yield xform
 
+    def to_table(self):
+        return XformTable(self)
+
+    def __getstate__(self):
+        #The plan holds ElementTree nodes, it gets rebuilt when needed
+        state = self.__dict__.copy()
+        state['_plan'] = None
+        return state
+
     def _iter_attributes(self):
         #This returns all writable attributes and the derived attribs
         return itertools.chain(
@@ -185,13 +254,21 @@ class Flame(object):
     @property
     def size(self):
         return self.width, self.height
+    @size.setter
+    def size(self, value):
+        self.width, self.height = value
 
     @property
     def center(self):
         return self.x_offset, self.y_offset
+    @center.setter
+    def center(self, value):
+        self.x_offset, self.y_offset = value
 
 
 class Xform(object):
+    #rotated by utils loops unless set to 0 (finalxforms never are)
+    animate = 1.
     _never_write = (
             '_parent',
             'post',
@@ -203,7 +280,19 @@ class Xform(object):
             'yy',
             'ox',
             'oy',
+            '_index',
+            '_polars',
+            '_dirty',
             )
+    #coef -> the x, y or o pair it belongs to
+    _pairs = {
+            'xx': 'x',
+            'xy': 'x',
+            'yx': 'y',
+            'yy': 'y',
+            'ox': 'o',
+            'oy': 'o',
+            }
     _defaults = {
             'coefs': (1., 0., 0., 1., 0., 0.),
             'linear': 1,
@@ -227,9 +316,11 @@ class Xform(object):
 
     def from_element(self, element):
         for k, v in element.items():
+            if k in ('chaos', 'post'):
+                continue
             try:
                 if " " in v:
-                    setattr(self, k, float(v))
+                    setattr(self, k, map(float, v.split()))
                 else:
                     setattr(self, k, float(v))
             except ValueError:
@@ -245,58 +336,79 @@ class Xform(object):
         for lfo in element.findall('lfo'):
             self.lfos.append(LFO(self, lfo))
 
-    def to_element(self, print_lfos=True):
+    def to_element(self, print_lfos=True, values=None):
+        #values holds per-frame overrides as produced by an XformPlan
+        if values is None:
+            values = {}
         #need the right tag
         if self.isfinal():
             element = ET.Element('finalxform')
         else:
             element = ET.Element('xform')
         #coefs attr
-        element.set('coefs', "{0} {1} {2} {3} {4} {5}".format(*self.coefs))
+        element.set('coefs', "{0} {1} {2} {3} {4} {5}".format(
+            *values.get('coefs', self.coefs)))
         #post attr
-        if self.post:
+        if 'post' in values:
+            element.set('post', "{0} {1} {2} {3} {4} {5}".format(
+                *values['post']))
+        elif self.post:
             element.set('post', self.post.to_string())
         #chaos attr
-        if self.chaos:
+        if self.chaos and self.chaos.isactive():
             element.set('chaos', self.chaos.to_string())
         #other attrs
         for k, v in self._iter_attributes():
-            if isinstance(v, basestring):
-                pass
-            elif hasattr(v, "__iter__"):
-                v = " ".join(str(i if i % 1 else int(i)) for i in v)
-            else:
-                v = v if v % 1 else int(v)
-            element.set(k, v)
+            element.set(k, format_value(values.get(k, v)))
         #lfos if necessary
         if self.lfos and print_lfos:
             for lfo in self.lfos:
-                if lfo.is_active():
-                    element.append(lfo.to_string())
+                if lfo.isactive():
+                    element.append(lfo.to_element())
         return element
 
     def to_string(self, print_lfos=True):
-        return ET.tostring(self.to_element(print_lfos))
+        return writer.xform_string(self, print_lfos)
 
     def copy(self):
-        return Xform(ET.fromstring(self.to_string()))
+        #A clone in the same flame, which isn't added to its xforms. It starts
+        #out clean, so its own edits still reach the flame once it's added.
+        rtn = self._clone(self._parent)
+        if self._parent is not None:
+            self._parent._touch()
+        return rtn
+
+    def _clone(self, parent):
+        rtn = type(self).__new__(type(self))
+        state = rtn.__dict__
+        for k, v in self.__dict__.iteritems():
+            state[k] = list(v) if type(v) is list else v
+        state['_parent'] = parent
+        state['_dirty'] = False
+        state.pop('_index', None)
+        if '_polars' in state:
+            state['_polars'] = dict(self._polars)
+        if 'lfos' in state:
+            state['lfos'] = [lfo._clone(rtn) for lfo in self.lfos]
+        if state.get('post'):
+            state['post'] = self.post._clone(rtn)
+        if state.get('chaos'):
+            state['chaos'] = self.chaos._clone(rtn)
+        return rtn
 
     def get_at(self, i):
-        xform = self.copy()
-        if self.lfos:
-            for lfo in self.lfos:
-                if lfo.target in ['rotate', 'rotate_x', 'rotate_y', 'orbit']:
-                    method = getattr(xform, lfo.target)
-                    method(lfo.get_at(i))
-                elif lfo.target in ['protate', 'protate_x', 'protate_y', 'porbit']:
-                    method = getattr(xform, lfo.target[1:])
-                    method(lfo.get_at(i))
-                else:
-                    setattr(xform, lfo.target, (getattr(xform, lfo.target) + lfo.get_at(i)))
-        return xform.to_element(print_lfos=False)
+        #Uses the compiled plan of the flame the xform is in, only an xform
+        #outside of one gets a plan of its own
+        index = self.index
+        if index is None:
+            plan = XformPlan(self)
+        else:
+            plan = self._parent.plan.xforms[index]
+        return self.to_element(print_lfos=False, values=plan.get_at(i))
 
     def list_vars(self):
-        return [i for i in variation_list if i in self.__dict__]
+        return sorted((k for k in self.__dict__ if k in variations),
+                      key=variations.get)
 
     def iter_lfos(self):
         for lfo in self.lfos:
@@ -306,7 +418,7 @@ class Xform(object):
         return ((k, v) for (k, v) in self.__dict__.iteritems() if k not in self._never_write)
 
     def isfinal(self):
-        return self is self._parent.final
+        return self is getattr(self._parent, 'final', None)
 
     def ispost(self):
         return type(self._parent) == Xform
@@ -319,6 +431,7 @@ class Xform(object):
 
     def add_lfo(self):
         self.lfos.append(LFO(self))
+        self._touch()
 
     def scale(self, v):
         self.xp = (self.xp[0]*v, self.xp[1])
@@ -340,6 +453,29 @@ class Xform(object):
     def rotate_y(self, deg):
         self.yp = (self.yp[0], self.yp[1]+deg)
 
+    def scale_batch(self, vs):
+        #Coefs for each scale in vs as a len(vs) x 6 array, the xform itself
+        #isn't changed.
+        vs = np.asarray(vs, dtype=float)
+        (xl, xt), (yl, yt), (ol, ot) = self.polars
+        return self._batch((xl*vs, xt), (yl*vs, yt), (ol, ot), len(vs))
+
+    def rotate_batch(self, degs):
+        degs = np.asarray(degs, dtype=float)
+        (xl, xt), (yl, yt), (ol, ot) = self.polars
+        return self._batch((xl, xt+degs), (yl, yt+degs), (ol, ot), len(degs))
+
+    def orbit_batch(self, degs):
+        degs = np.asarray(degs, dtype=float)
+        (xl, xt), (yl, yt), (ol, ot) = self.polars
+        return self._batch((xl, xt), (yl, yt), (ol, ot+degs), len(degs))
+
+    def _batch(self, xp, yp, op, n):
+        rtn = np.empty((n, 6))
+        for axis, p in enumerate((xp, yp, op)):
+            rtn[:, axis*2], rtn[:, axis*2+1] = rect_array(*p)
+        return rtn
+
     def orbit(self, deg, pivot=(0, 0)):
         if pivot == (0, 0):
             self.op = (self.op[0], self.op[1]+deg)
@@ -352,10 +488,19 @@ class Xform(object):
     def index(self):
         if self.isfinal():
             return None
+        #The last known position is checked first, the list is only searched
+        #when the xforms have been reordered.
+        xforms = getattr(self._parent, 'xforms', None)
         try:
-            return self._parent.xforms.index(self)
+            if xforms[self._index] is self:
+                return self._index
+        except (AttributeError, IndexError, TypeError):
+            pass
+        try:
+            self._index = xforms.index(self)
         except (AttributeError, ValueError):
             return None
+        return self._index
 
     @property
     def coefs(self):
@@ -394,24 +539,62 @@ class Xform(object):
 
     @property
     def xp(self):
-        return polar((self.xx, self.xy))
+        return self._get_polar('x')
     @xp.setter
     def xp(self, value):
-        self.xx, self.xy = rect(value)
+        self._set_polar('x', value)
 
     @property
     def yp(self):
-        return polar((self.yx, self.yy))
+        return self._get_polar('y')
     @yp.setter
     def yp(self, value):
-        self.yx, self.yy = rect(value)
+        self._set_polar('y', value)
 
     @property
     def op(self):
-        return polar((self.ox, self.oy))
+        return self._get_polar('o')
     @op.setter
     def op(self, value):
-        self.ox, self.oy = rect(value)
+        self._set_polar('o', value)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        self._edited(name)
+
+    def __delattr__(self, name):
+        object.__delattr__(self, name)
+        self._edited(name)
+
+    def _edited(self, name):
+        #a changed coef makes the cached polar form of its pair stale
+        if name in self._pairs:
+            self.__dict__.get('_polars', {}).pop(self._pairs[name], None)
+        if name[0] != '_':
+            self._touch()
+
+    def _touch(self):
+        #Marks this xform and the flame it's in as edited. Once it's dirty
+        #the flame already knows, until the plan is refreshed.
+        if not self.__dict__.get('_dirty'):
+            self.__dict__['_dirty'] = True
+            parent = self.__dict__.get('_parent')
+            if parent is not None:
+                parent._touch()
+
+    def _get_polar(self, pair):
+        #Polar forms are cached until their coefs change, so rotating keeps
+        #the exact length and angle instead of recomputing them from rect.
+        polars = self.__dict__.setdefault('_polars', {})
+        try:
+            return polars[pair]
+        except KeyError:
+            polars[pair] = polar(getattr(self, pair))
+            return polars[pair]
+
+    def _set_polar(self, pair, value):
+        setattr(self, pair, rect(value))
+        self.__dict__.setdefault('_polars', {})[pair] = tuple(value)
 
 
 class PostXform(Xform):
@@ -442,12 +625,10 @@ class Chaos(object):
         if element:
             self.from_element(element)
         else:
-            self.value = []
-            for i in xrange(self._parent._numx):
-                self.value.append(1)
+            self.value = (1,) * len(self._parent._parent.xforms)
 
     def from_element(self, element):
-        self.value = map(float, element.split())
+        self.value = tuple(map(float, element.split()))
 
     def to_string(self):
         rtn = []
@@ -463,6 +644,19 @@ class Chaos(object):
                 return True
         return False
 
+    def __setattr__(self, name, value):
+        #value is a tuple so clones can share it, it can only be replaced
+        if name == 'value':
+            value = tuple(value)
+        object.__setattr__(self, name, value)
+        if name != '_parent':
+            self._parent._touch()
+
+    def _clone(self, parent):
+        rtn = Chaos.__new__(Chaos)
+        rtn.__dict__.update(self.__dict__, _parent=parent)
+        return rtn
+
 
 class LFO(object):
     _defaults = {
@@ -500,11 +694,24 @@ class LFO(object):
 
     def __init__(self, parent, element=None):
         self._parent = parent
-        if element:
+        if element is not None:
             self.from_element(element)
         else:
+            #target has no valid default, so bypass its setter
+            self._target = self._defaults['target']
             for (k, v) in self._defaults.items():
-                setattr(self, k, v)
+                if k != 'target':
+                    setattr(self, k, v)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name != '_parent':
+            self._parent._touch()
+
+    def _clone(self, parent):
+        rtn = LFO.__new__(LFO)
+        rtn.__dict__.update(self.__dict__, _parent=parent)
+        return rtn
 
     def from_element(self, element):
         self.target = element.get('target', self._defaults['target'])
@@ -516,14 +723,17 @@ class LFO(object):
     def to_element(self):
         if self.isactive():
             element = ET.Element('lfo')
-            for (k, v) in self._dict__.iteritems():
-                element.set(k, v)
+            for k in self._defaults:
+                element.set(k, format_value(getattr(self, k)))
             return element
         return None
 
     def to_string(self):
         return ET.tostring(self.to_element())
 
+    def isactive(self):
+        return self._target is not None and self.amp != 0
+
     def get_at(self, i):
         if self.isactive():
             method = getattr(lfos, self._shape)
@@ -531,6 +741,15 @@ class LFO(object):
         else:
             return 0.
 
+    def get_range(self, nframes):
+        #Values for a whole loop of nframes, frame n being at n/nframes
+        times = np.arange(nframes) / float(nframes)
+        if self.isactive():
+            method = getattr(lfos, self._shape + '_array')
+            return method(times*self.freq, self.amp, self.phase)
+        else:
+            return np.zeros(nframes)
+
     @property
     def target(self):
         return self._target
@@ -538,9 +757,8 @@ class LFO(object):
     def target(self, value):
         if value in self._valid_targets:
             self._target = value
-            try:
-                self._targetp = self._parent.__dict__[self.target]
-            except KeyError:
+            #rotations move coefs, everything else adds to an attribute
+            if value not in ROTATIONS and value not in self._parent.__dict__:
                 setattr(self._parent, value, 0.)
         else:
             raise ValueError('{0} is an invalid target'.format(value))
@@ -550,108 +768,168 @@ class LFO(object):
         return self._shape
     @shape.setter
     def shape(self, value):
-        if value in self.shapes:
+        if value in self._shapes:
             self._shape = value
         else:
             raise ValueError('Invalid shape')
 
 
 class Palette(object):
+    #All 256 colors live in one 256x3 array of 0-255 rgb values, Colors are
+    #views into it.
     def __init__(self, parent, element=None):
         self._parent = parent
-        self.colors = []
-        for i in xrange(256):
-            self.colors.append(Color(i, self._parent))
+        self.array = np.zeros((256, 3))
         if element:
             self.from_element(element)
 
     def from_element(self, element):
         for color in element:
-            self.colors[color._index] = Color(self._parent, element=element)
+            self.array[int(color.get('index'))] = map(
+                    float, color.get('rgb', '0 0 0').split())
 
     def to_elements(self):
         return [color.to_element() for color in self.colors]
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name == 'array':
+            self.__dict__['_owned'] = True
+            self._touch()
+
+    def _touch(self):
+        self._parent._touch(static=True)
+
+    def _clone(self, parent):
+        #Shares the array until either palette writes to it, see _set. Both
+        #get a read-only view of it, so writing into array directly fails
+        #instead of changing the other palette too.
+        shared = self.array.view()
+        shared.setflags(write=False)
+        rtn = Palette.__new__(Palette)
+        rtn.__dict__.update(self.__dict__, _parent=parent, _owned=False,
+                            array=shared)
+        self.__dict__.update(_owned=False, array=shared)
+        return rtn
+
+    def _set(self, index, value):
+        #Colors change the array in place through here, assigning array
+        #replaces it so that doesn't need to
+        if not self._owned:
+            self.array = self.array.copy()
+        self.array[index] = value
+        self._touch()
+
+    @property
+    def colors(self):
+        return [Color(self, i) for i in xrange(len(self.array))]
+
+    def __getitem__(self, index):
+        return Color(self, index)
+
+    def __len__(self):
+        return len(self.array)
+
+    @property
+    def hsv(self):
+        return rgb_to_hsv(self.array / 255.)
+    @hsv.setter
+    def hsv(self, value):
+        self.array = hsv_to_rgb(value) * 255.
+
+    def rotate_hue(self, v):
+        #v is a fraction of the color wheel
+        hsv = self.hsv
+        hsv[:, 0] = (hsv[:, 0] + v) % 1.
+        self.hsv = hsv
+
+    def scale_saturation(self, v):
+        hsv = self.hsv
+        hsv[:, 1] = np.clip(hsv[:, 1] * v, 0., 1.)
+        self.hsv = hsv
+
+    def scale_value(self, v):
+        hsv = self.hsv
+        hsv[:, 2] = np.clip(hsv[:, 2] * v, 0., 1.)
+        self.hsv = hsv
+
+    def blend(self, other, t):
+        #New palette t of the way from this one to other
+        palette = Palette(self._parent)
+        palette.array = self.array + (other.array - self.array) * t
+        return palette
+
 
 class Color(object):
-    def __init__(self, parent, index=None, element=None):
+    def __init__(self, parent, index):
         self._parent = parent
         self._index = index
-        if element:
-            self.from_element(element)
-        else:
-            self._color = (0, 0, 0)
 
-    def from_element(self, element):
-        self._index = int(element.get('index'))
-        self.rgb = map(float, element.get('rgb', '0 0 0').split())
-
-    def to_element(self, element):
+    def to_element(self):
         element = ET.Element('color')
-        element.set('index', self._index)
-        element.set('rgb', '{0} {1} {2}'.format(*self.rgb))
+        element.set('index', str(self._index))
+        element.set('rgb', format_value(self.rgb))
         return element
 
     @property
     def index(self):
-        try:
-            return self._parent.index(self)
-        except (AttributeError, ValueError):
-            return None
+        return self._index
 
     @property
     def rgb(self):
-        return self._color
+        return tuple(self._parent.array[self._index].tolist())
     @rgb.setter
     def rgb(self, value):
-        self._color = value
+        self._parent._set(self._index, value)
 
     @property
     def r(self):
-        return self._color[0]
+        return float(self._parent.array[self._index, 0])
     @r.setter
     def r(self, value):
-        self._color = value, self.g, self.b
+        self._parent._set((self._index, 0), value)
 
     @property
     def g(self):
-        return self._color[1]
+        return float(self._parent.array[self._index, 1])
     @g.setter
     def g(self, value):
-        self._color = self.r, value, self.b
+        self._parent._set((self._index, 1), value)
 
     @property
     def b(self):
-        return self._color[2]
+        return float(self._parent.array[self._index, 2])
     @b.setter
     def b(self, value):
-        self._color = self.r, self.g, value
+        self._parent._set((self._index, 2), value)
 
     @property
     def hsv(self):
         return colorsys.rgb_to_hsv(*(x/255. for x in self.rgb))
     @hsv.setter
     def hsv(self, value):
-        self._color = colorsys.hsv_to_rgb(*value)
+        self.rgb = tuple(x*255. for x in colorsys.hsv_to_rgb(*value))
 
     @property
     def h(self):
         return self.hsv[0]
     @h.setter
     def h(self, value):
-        self._color = colorsys.hsv_to_rgb(value, self.s, self.v)
+        h, s, v = self.hsv
+        self.hsv = value, s, v
 
     @property
     def s(self):
         return self.hsv[1]
     @s.setter
     def s(self, value):
-        self._color = colorsys.hsv_to_rgb(self.h, value, self.v)
+        h, s, v = self.hsv
+        self.hsv = h, value, v
 
     @property
     def v(self):
         return self.hsv[2]
     @v.setter
     def v(self, value):
-        self._color = colorsys.hsv_to_rgb(self.h, self.s, value)
-
+        h, s, v = self.hsv
+        self.hsv = h, s, value
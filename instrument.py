@@ -0,0 +1,138 @@
+import contextlib
+import sys
+import timeit
+import xml.etree.cElementTree as ET
+
+import flame
+import plan
+import utils
+import writer
+
+#stage -> (owner, attribute) of every function timed as part of it. Nothing is
+#patched until profiling is enabled, so it costs nothing otherwise.
+STAGES = (
+        ('frame', ((flame.Flame, 'get_at'),
+                   (flame.Flame, 'string_at'))),
+        ('lfo', ((flame.LFO, 'get_at'),
+                 (flame.LFO, 'get_range'),
+                 (plan.XformPlan, 'get_at'))),
+        ('copy', ((flame.Flame, 'copy'),
+                  (flame.Xform, 'copy'))),
+        ('polar', ((utils, 'polar'),
+                   (utils, 'rect'),
+                   (flame, 'polar'),
+                   (flame, 'rect'),
+                   (plan, 'rect'))),
+        ('serialize', ((ET, 'tostring'),
+                       (flame.Flame, 'to_element'),
+                       (flame.Xform, 'to_element'),
+                       (writer, 'flame_string'),
+                       (writer, 'xform_string'),
+                       (writer.XformWriter, 'write'))),
+        )
+
+#Net number of allocated blocks. Python 2 has no getallocatedblocks and
+#nothing else that counts allocations without suspending garbage collection,
+#which would leak every flame, so blocks are None there.
+_blocks = getattr(sys, 'getallocatedblocks', None)
+_active = None
+
+
+class Profile(object):
+    #Wall time, calls and allocated blocks per stage, in total, per flame
+    #name and per frame (each call of Flame.get_at). A stage called from
+    #within itself is only timed once. Blocks are None where the interpreter
+    #can't count them, Python 2 included. callback, if given, is called as
+    #callback(stage, flame_name, frame, seconds, blocks) after each outermost
+    #call, frame being the index into frames or None.
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.totals = {}
+        self.flames = {}
+        self.frames = []
+        self._depth = dict((stage, 0) for stage, targets in STAGES)
+        self._flame = []
+        self._frame = []
+        self._saved = []
+
+    def enable(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError('Profiling is already enabled')
+        for stage, targets in STAGES:
+            for owner, name in targets:
+                original = owner.__dict__[name]
+                self._saved.append((owner, name, original))
+                setattr(owner, name, self._wrap(stage, name, original))
+        _active = self
+
+    def disable(self):
+        global _active
+        while self._saved:
+            owner, name, original = self._saved.pop()
+            setattr(owner, name, original)
+        _active = None
+
+    def _wrap(self, stage, name, function):
+        profile = self
+        def wrapper(*args, **kwargs):
+            #Flame methods say which flame, and get_at which frame, the
+            #stages they call belong to
+            owner = None
+            if args and isinstance(args[0], flame.Flame):
+                owner = args[0]
+            if owner is not None:
+                profile._flame.append(str(getattr(owner, 'name', None)))
+            if stage == 'frame':
+                profile.frames.append({'flame': profile._flame[-1],
+                                       'time': args[1] if len(args) > 1
+                                               else kwargs.get('i'),
+                                       'stages': {}})
+                profile._frame.append(len(profile.frames) - 1)
+            profile._depth[stage] += 1
+            blocks = _blocks() if _blocks is not None else None
+            start = timeit.default_timer()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = timeit.default_timer() - start
+                if blocks is not None:
+                    blocks = _blocks() - blocks
+                profile._depth[stage] -= 1
+                profile._record(stage, seconds, blocks,
+                                profile._depth[stage] == 0)
+                if stage == 'frame':
+                    profile._frame.pop()
+                if owner is not None:
+                    profile._flame.pop()
+        wrapper.__name__ = name
+        return wrapper
+
+    def _record(self, stage, seconds, blocks, outermost):
+        name = self._flame[-1] if self._flame else None
+        frame = self._frame[-1] if self._frame else None
+        groups = [self.totals, self.flames.setdefault(name, {})]
+        if frame is not None:
+            groups.append(self.frames[frame]['stages'])
+        for group in groups:
+            stats = group.setdefault(stage, {'calls': 0, 'seconds': 0.,
+                                             'blocks': None})
+            stats['calls'] += 1
+            if outermost:
+                stats['seconds'] += seconds
+                if blocks is not None:
+                    stats['blocks'] = (stats['blocks'] or 0) + blocks
+        if outermost and self.callback is not None:
+            self.callback(stage, name, frame, seconds, blocks)
+
+
+@contextlib.contextmanager
+def profile(callback=None):
+    #with profile() as p: ... records into p for the duration of the block.
+    #Only covers this process, worker processes of iter_frames aren't seen.
+    rtn = Profile(callback)
+    rtn.enable()
+    try:
+        yield rtn
+    finally:
+        rtn.disable()
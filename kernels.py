@@ -0,0 +1,1542 @@
+import math
+import numpy as np
+from variations import *
+
+#Batched variation kernels keyed by variation id. Every kernel comes as a
+#numpy version that maps arrays of points at once and a scalar reference
+#version written with math, which the batched one can be checked against.
+#Both are called as kernel(x, y, w, p, rand): x and y are the point after
+#the affine transform, w is the variation weight, p the xform's params
+#(see params) and rand holds the kernel's nrand uniform draws, an
+#nrand x len(x) array for batched kernels and a tuple for scalar ones.
+#They return the weighted (x, y) contribution of the variation. Kernels
+#that use randomness only ever read it from rand, so given the same draws
+#both versions agree, see verify.
+
+EPS = 1e-10
+
+#Values flam3 uses for variables a genome doesn't set
+variable_defaults = {
+        'blob_low': 0.,
+        'blob_high': 1.,
+        'blob_waves': 1.,
+        'julian_power': 1.,
+        'julian_dist': 1.,
+        'juliascope_power': 1.,
+        'juliascope_dist': 1.,
+        'pie_slices': 6.,
+        'pie_thickness': 0.5,
+        'ngon_sides': 5.,
+        'ngon_power': 3.,
+        'ngon_circle': 1.,
+        'ngon_corners': 2.,
+        'curl_c1': 1.,
+        'rectangles_x': 1.,
+        'rectangles_y': 1.,
+        'super_shape_n1': 1.,
+        'super_shape_n2': 1.,
+        'super_shape_n3': 1.,
+        'conic_eccentricity': 1.,
+        'parabola_height': 1.,
+        'parabola_width': 1.,
+        'bent2_x': 1.,
+        'bent2_y': 1.,
+        'cell_size': 1.,
+        'cpow_r': 1.,
+        'cpow_power': 1.,
+        'curve_xlength': 1.,
+        'curve_ylength': 1.,
+        'modulus_x': 1.,
+        'modulus_y': 1.,
+        'oscilloscope_separation': 1.,
+        'oscilloscope_frequency': math.pi,
+        'oscilloscope_amplitude': 1.,
+        'separation_x': 1.,
+        'separation_y': 1.,
+        'split_xsize': 0.5,
+        'split_ysize': 0.5,
+        'stripes_space': 0.5,
+        'stripes_warp': 0.01,
+        'wedge_count': 1.,
+        'wedge_julia_count': 1.,
+        'wedge_julia_power': 1.,
+        'wedge_sph_count': 1.,
+        'whorl_inside': 1.,
+        'whorl_outside': 1.,
+        'auger_freq': 1.,
+        'auger_scale': 1.,
+        'auger_weight': 0.5,
+        'mobius_re_a': 1.,
+        'mobius_re_d': 1.,
+        }
+
+
+class Kernel(object):
+    def __init__(self, batched, scalar, nrand=0, pre=False):
+        self.batched = batched
+        self.scalar = scalar
+        #uniform draws needed per point
+        self.nrand = nrand
+        #pre kernels move the point itself before the other variations run
+        self.pre = pre
+
+
+def params(xform):
+    #Every variable in variables, from xform or its default, plus coefs
+    rtn = dict((name, float(getattr(xform, name,
+                                    variable_defaults.get(name, 0.))))
+               for name in variable_list)
+    rtn['coefs'] = tuple(xform.coefs)
+    return rtn
+
+
+def linear(x, y, w, p, rand):
+    return w * x, w * y
+
+def linear_ref(x, y, w, p, rand):
+    return w * x, w * y
+
+
+def sinusoidal(x, y, w, p, rand):
+    return w * np.sin(x), w * np.sin(y)
+
+def sinusoidal_ref(x, y, w, p, rand):
+    return w * math.sin(x), w * math.sin(y)
+
+
+def spherical(x, y, w, p, rand):
+    r2 = w / (x*x + y*y + EPS)
+    return r2 * x, r2 * y
+
+def spherical_ref(x, y, w, p, rand):
+    r2 = w / (x*x + y*y + EPS)
+    return r2 * x, r2 * y
+
+
+def swirl(x, y, w, p, rand):
+    r2 = x*x + y*y
+    c1, c2 = np.sin(r2), np.cos(r2)
+    return w * (c1*x - c2*y), w * (c2*x + c1*y)
+
+def swirl_ref(x, y, w, p, rand):
+    r2 = x*x + y*y
+    c1, c2 = math.sin(r2), math.cos(r2)
+    return w * (c1*x - c2*y), w * (c2*x + c1*y)
+
+
+def horseshoe(x, y, w, p, rand):
+    r = w / (np.sqrt(x*x + y*y) + EPS)
+    return (x - y) * (x + y) * r, 2. * x * y * r
+
+def horseshoe_ref(x, y, w, p, rand):
+    r = w / (math.sqrt(x*x + y*y) + EPS)
+    return (x - y) * (x + y) * r, 2. * x * y * r
+
+
+def polar(x, y, w, p, rand):
+    return (w * np.arctan2(x, y) / math.pi,
+            w * (np.sqrt(x*x + y*y) - 1.))
+
+def polar_ref(x, y, w, p, rand):
+    return (w * math.atan2(x, y) / math.pi,
+            w * (math.sqrt(x*x + y*y) - 1.))
+
+
+def handkerchief(x, y, w, p, rand):
+    a = np.arctan2(x, y)
+    r = np.sqrt(x*x + y*y)
+    return w * r * np.sin(a + r), w * r * np.cos(a - r)
+
+def handkerchief_ref(x, y, w, p, rand):
+    a = math.atan2(x, y)
+    r = math.sqrt(x*x + y*y)
+    return w * r * math.sin(a + r), w * r * math.cos(a - r)
+
+
+def heart(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y)
+    a = r * np.arctan2(x, y)
+    r = w * r
+    return r * np.sin(a), -r * np.cos(a)
+
+def heart_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y)
+    a = r * math.atan2(x, y)
+    r = w * r
+    return r * math.sin(a), -r * math.cos(a)
+
+
+def disc(x, y, w, p, rand):
+    a = np.arctan2(x, y) / math.pi
+    r = math.pi * np.sqrt(x*x + y*y)
+    return w * np.sin(r) * a, w * np.cos(r) * a
+
+def disc_ref(x, y, w, p, rand):
+    a = math.atan2(x, y) / math.pi
+    r = math.pi * math.sqrt(x*x + y*y)
+    return w * math.sin(r) * a, w * math.cos(r) * a
+
+
+#flam3 calls x/r "sina" and y/r "cosa", spiral and the others keep that.
+def spiral(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y) + EPS
+    r1 = w / r
+    return r1 * (y/r + np.sin(r)), r1 * (x/r - np.cos(r))
+
+def spiral_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y) + EPS
+    r1 = w / r
+    return r1 * (y/r + math.sin(r)), r1 * (x/r - math.cos(r))
+
+
+def hyperbolic(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y) + EPS
+    return w * (x/r) / r, w * (y/r) * r
+
+def hyperbolic_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y) + EPS
+    return w * (x/r) / r, w * (y/r) * r
+
+
+def diamond(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y) + EPS
+    return w * (x/r) * np.cos(r), w * (y/r) * np.sin(r)
+
+def diamond_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y) + EPS
+    return w * (x/r) * math.cos(r), w * (y/r) * math.sin(r)
+
+
+def ex(x, y, w, p, rand):
+    a = np.arctan2(x, y)
+    r = np.sqrt(x*x + y*y)
+    m0 = np.sin(a + r) ** 3 * r
+    m1 = np.cos(a - r) ** 3 * r
+    return w * (m0 + m1), w * (m0 - m1)
+
+def ex_ref(x, y, w, p, rand):
+    a = math.atan2(x, y)
+    r = math.sqrt(x*x + y*y)
+    m0 = math.sin(a + r) ** 3 * r
+    m1 = math.cos(a - r) ** 3 * r
+    return w * (m0 + m1), w * (m0 - m1)
+
+
+def bent(x, y, w, p, rand):
+    return (w * np.where(x < 0, x * 2., x),
+            w * np.where(y < 0, y / 2., y))
+
+def bent_ref(x, y, w, p, rand):
+    return w * (x * 2. if x < 0 else x), w * (y / 2. if y < 0 else y)
+
+
+def fisheye(x, y, w, p, rand):
+    r = 2. * w / (np.sqrt(x*x + y*y) + 1.)
+    return r * y, r * x
+
+def fisheye_ref(x, y, w, p, rand):
+    r = 2. * w / (math.sqrt(x*x + y*y) + 1.)
+    return r * y, r * x
+
+
+def exponential(x, y, w, p, rand):
+    dx = w * np.exp(x - 1.)
+    dy = math.pi * y
+    return dx * np.cos(dy), dx * np.sin(dy)
+
+def exponential_ref(x, y, w, p, rand):
+    dx = w * math.exp(x - 1.)
+    dy = math.pi * y
+    return dx * math.cos(dy), dx * math.sin(dy)
+
+
+def power(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y) + EPS
+    sina, cosa = x / r, y / r
+    r = w * r ** sina
+    return r * cosa, r * sina
+
+def power_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y) + EPS
+    sina, cosa = x / r, y / r
+    r = w * r ** sina
+    return r * cosa, r * sina
+
+
+def cosine(x, y, w, p, rand):
+    a = x * math.pi
+    return w * np.cos(a) * np.cosh(y), -w * np.sin(a) * np.sinh(y)
+
+def cosine_ref(x, y, w, p, rand):
+    a = x * math.pi
+    return w * math.cos(a) * math.cosh(y), -w * math.sin(a) * math.sinh(y)
+
+
+def eyefish(x, y, w, p, rand):
+    r = 2. * w / (np.sqrt(x*x + y*y) + 1.)
+    return r * x, r * y
+
+def eyefish_ref(x, y, w, p, rand):
+    r = 2. * w / (math.sqrt(x*x + y*y) + 1.)
+    return r * x, r * y
+
+
+def bubble(x, y, w, p, rand):
+    r = w / (0.25 * (x*x + y*y) + 1.)
+    return r * x, r * y
+
+def bubble_ref(x, y, w, p, rand):
+    r = w / (0.25 * (x*x + y*y) + 1.)
+    return r * x, r * y
+
+
+def cylinder(x, y, w, p, rand):
+    return w * np.sin(x), w * y
+
+def cylinder_ref(x, y, w, p, rand):
+    return w * math.sin(x), w * y
+
+
+def julia(x, y, w, p, rand):
+    a = 0.5 * np.arctan2(x, y) + np.where(rand[0] < 0.5, math.pi, 0.)
+    r = w * np.sqrt(np.sqrt(x*x + y*y))
+    return r * np.cos(a), r * np.sin(a)
+
+def julia_ref(x, y, w, p, rand):
+    a = 0.5 * math.atan2(x, y) + (math.pi if rand[0] < 0.5 else 0.)
+    r = w * math.sqrt(math.sqrt(x*x + y*y))
+    return r * math.cos(a), r * math.sin(a)
+
+
+def waves(x, y, w, p, rand):
+    xx, xy, yx, yy, ox, oy = p['coefs']
+    dx2 = 1. / (ox*ox + EPS)
+    dy2 = 1. / (oy*oy + EPS)
+    return (w * (x + yx * np.sin(y * dx2)),
+            w * (y + yy * np.sin(x * dy2)))
+
+def waves_ref(x, y, w, p, rand):
+    xx, xy, yx, yy, ox, oy = p['coefs']
+    dx2 = 1. / (ox*ox + EPS)
+    dy2 = 1. / (oy*oy + EPS)
+    return (w * (x + yx * math.sin(y * dx2)),
+            w * (y + yy * math.sin(x * dy2)))
+
+
+def popcorn(x, y, w, p, rand):
+    ox, oy = p['coefs'][4:]
+    return (w * (x + ox * np.sin(np.tan(3. * y))),
+            w * (y + oy * np.sin(np.tan(3. * x))))
+
+def popcorn_ref(x, y, w, p, rand):
+    ox, oy = p['coefs'][4:]
+    return (w * (x + ox * math.sin(math.tan(3. * y))),
+            w * (y + oy * math.sin(math.tan(3. * x))))
+
+
+def rings(x, y, w, p, rand):
+    dx = p['coefs'][4] ** 2 + EPS
+    r = np.sqrt(x*x + y*y) + EPS
+    m = w * (np.fmod(r + dx, 2. * dx) - dx + r * (1. - dx))
+    return m * y / r, m * x / r
+
+def rings_ref(x, y, w, p, rand):
+    dx = p['coefs'][4] ** 2 + EPS
+    r = math.sqrt(x*x + y*y) + EPS
+    m = w * (math.fmod(r + dx, 2. * dx) - dx + r * (1. - dx))
+    return m * y / r, m * x / r
+
+
+def fan(x, y, w, p, rand):
+    ox, oy = p['coefs'][4:]
+    dx = math.pi * (ox*ox + EPS)
+    dx2 = 0.5 * dx
+    a = np.arctan2(x, y)
+    r = w * np.sqrt(x*x + y*y)
+    a = a + np.where(np.fmod(a + oy, dx) > dx2, -dx2, dx2)
+    return r * np.cos(a), r * np.sin(a)
+
+def fan_ref(x, y, w, p, rand):
+    ox, oy = p['coefs'][4:]
+    dx = math.pi * (ox*ox + EPS)
+    dx2 = 0.5 * dx
+    a = math.atan2(x, y)
+    r = w * math.sqrt(x*x + y*y)
+    a += -dx2 if math.fmod(a + oy, dx) > dx2 else dx2
+    return r * math.cos(a), r * math.sin(a)
+
+
+def blob(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y) + EPS
+    a = np.arctan2(x, y)
+    low, high = p['blob_low'], p['blob_high']
+    m = r * (low + (high - low) * (0.5 + 0.5 * np.sin(p['blob_waves'] * a)))
+    return w * (x / r) * m, w * (y / r) * m
+
+def blob_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y) + EPS
+    a = math.atan2(x, y)
+    low, high = p['blob_low'], p['blob_high']
+    m = r * (low + (high - low) * (0.5 + 0.5 * math.sin(p['blob_waves'] * a)))
+    return w * (x / r) * m, w * (y / r) * m
+
+
+def pdj(x, y, w, p, rand):
+    return (w * (np.sin(p['pdj_a'] * y) - np.cos(p['pdj_b'] * x)),
+            w * (np.sin(p['pdj_c'] * x) - np.cos(p['pdj_d'] * y)))
+
+def pdj_ref(x, y, w, p, rand):
+    return (w * (math.sin(p['pdj_a'] * y) - math.cos(p['pdj_b'] * x)),
+            w * (math.sin(p['pdj_c'] * x) - math.cos(p['pdj_d'] * y)))
+
+
+def fan2(x, y, w, p, rand):
+    dy = p['fan2_y']
+    dx = math.pi * (p['fan2_x'] ** 2 + EPS)
+    dx2 = 0.5 * dx
+    a = np.arctan2(x, y)
+    r = w * np.sqrt(x*x + y*y)
+    t = a + dy - dx * np.trunc((a + dy) / dx)
+    a = np.where(t > dx2, a - dx2, a + dx2)
+    return r * np.sin(a), r * np.cos(a)
+
+def fan2_ref(x, y, w, p, rand):
+    dy = p['fan2_y']
+    dx = math.pi * (p['fan2_x'] ** 2 + EPS)
+    dx2 = 0.5 * dx
+    a = math.atan2(x, y)
+    r = w * math.sqrt(x*x + y*y)
+    t = a + dy - dx * math.trunc((a + dy) / dx)
+    a = a - dx2 if t > dx2 else a + dx2
+    return r * math.sin(a), r * math.cos(a)
+
+
+def rings2(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y) + EPS
+    dx = p['rings2_val'] ** 2 + EPS
+    m = r - 2. * dx * np.trunc((r + dx) / (2. * dx)) + r * (1. - dx)
+    return w * (x / r) * m, w * (y / r) * m
+
+def rings2_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y) + EPS
+    dx = p['rings2_val'] ** 2 + EPS
+    m = r - 2. * dx * math.trunc((r + dx) / (2. * dx)) + r * (1. - dx)
+    return w * (x / r) * m, w * (y / r) * m
+
+
+def perspective(x, y, w, p, rand):
+    angle = p['perspective_angle'] * math.pi / 2.
+    dist = p['perspective_dist']
+    t = 1. / (dist - y * math.sin(angle))
+    return w * dist * x * t, w * dist * math.cos(angle) * y * t
+
+def perspective_ref(x, y, w, p, rand):
+    angle = p['perspective_angle'] * math.pi / 2.
+    dist = p['perspective_dist']
+    t = 1. / (dist - y * math.sin(angle))
+    return w * dist * x * t, w * dist * math.cos(angle) * y * t
+
+
+def noise(x, y, w, p, rand):
+    a = rand[0] * 2. * math.pi
+    r = w * rand[1]
+    return x * r * np.cos(a), y * r * np.sin(a)
+
+def noise_ref(x, y, w, p, rand):
+    a = rand[0] * 2. * math.pi
+    r = w * rand[1]
+    return x * r * math.cos(a), y * r * math.sin(a)
+
+
+def julian(x, y, w, p, rand):
+    power = p['julian_power']
+    n = np.trunc(abs(power) * rand[0])
+    a = (np.arctan2(y, x) + 2. * math.pi * n) / power
+    r = w * (x*x + y*y) ** (p['julian_dist'] / power / 2.)
+    return r * np.cos(a), r * np.sin(a)
+
+def julian_ref(x, y, w, p, rand):
+    power = p['julian_power']
+    n = math.trunc(abs(power) * rand[0])
+    a = (math.atan2(y, x) + 2. * math.pi * n) / power
+    r = w * (x*x + y*y) ** (p['julian_dist'] / power / 2.)
+    return r * math.cos(a), r * math.sin(a)
+
+
+def juliascope(x, y, w, p, rand):
+    power = p['juliascope_power']
+    n = np.trunc(abs(power) * rand[0])
+    atan = np.arctan2(y, x)
+    a = (2. * math.pi * n + np.where(n % 2 == 0, atan, -atan)) / power
+    r = w * (x*x + y*y) ** (p['juliascope_dist'] / power / 2.)
+    return r * np.cos(a), r * np.sin(a)
+
+def juliascope_ref(x, y, w, p, rand):
+    power = p['juliascope_power']
+    n = math.trunc(abs(power) * rand[0])
+    atan = math.atan2(y, x)
+    a = (2. * math.pi * n + (atan if n % 2 == 0 else -atan)) / power
+    r = w * (x*x + y*y) ** (p['juliascope_dist'] / power / 2.)
+    return r * math.cos(a), r * math.sin(a)
+
+
+def blur(x, y, w, p, rand):
+    a = rand[0] * 2. * math.pi
+    r = w * rand[1]
+    return r * np.cos(a), r * np.sin(a)
+
+def blur_ref(x, y, w, p, rand):
+    a = rand[0] * 2. * math.pi
+    r = w * rand[1]
+    return r * math.cos(a), r * math.sin(a)
+
+
+def gaussian_blur(x, y, w, p, rand):
+    a = rand[0] * 2. * math.pi
+    r = w * (rand[1] + rand[2] + rand[3] + rand[4] - 2.)
+    return r * np.cos(a), r * np.sin(a)
+
+def gaussian_blur_ref(x, y, w, p, rand):
+    a = rand[0] * 2. * math.pi
+    r = w * (rand[1] + rand[2] + rand[3] + rand[4] - 2.)
+    return r * math.cos(a), r * math.sin(a)
+
+
+def radial_blur(x, y, w, p, rand):
+    angle = p['radial_blur_angle'] * math.pi / 2.
+    g = w * (rand[0] + rand[1] + rand[2] + rand[3] - 2.)
+    r = np.sqrt(x*x + y*y)
+    a = np.arctan2(y, x) + math.sin(angle) * g
+    z = math.cos(angle) * g - 1.
+    return r * np.cos(a) + z * x, r * np.sin(a) + z * y
+
+def radial_blur_ref(x, y, w, p, rand):
+    angle = p['radial_blur_angle'] * math.pi / 2.
+    g = w * (rand[0] + rand[1] + rand[2] + rand[3] - 2.)
+    r = math.sqrt(x*x + y*y)
+    a = math.atan2(y, x) + math.sin(angle) * g
+    z = math.cos(angle) * g - 1.
+    return r * math.cos(a) + z * x, r * math.sin(a) + z * y
+
+
+def pie(x, y, w, p, rand):
+    slices = p['pie_slices']
+    sl = np.trunc(rand[0] * slices + 0.5)
+    a = (p['pie_rotation'] +
+         2. * math.pi * (sl + rand[1] * p['pie_thickness']) / slices)
+    r = w * rand[2]
+    return r * np.cos(a), r * np.sin(a)
+
+def pie_ref(x, y, w, p, rand):
+    slices = p['pie_slices']
+    sl = math.trunc(rand[0] * slices + 0.5)
+    a = (p['pie_rotation'] +
+         2. * math.pi * (sl + rand[1] * p['pie_thickness']) / slices)
+    r = w * rand[2]
+    return r * math.cos(a), r * math.sin(a)
+
+
+def ngon(x, y, w, p, rand):
+    b = 2. * math.pi / p['ngon_sides']
+    r = (x*x + y*y) ** (p['ngon_power'] / 2.)
+    phi = np.arctan2(y, x)
+    phi = phi - b * np.floor(phi / b)
+    phi = np.where(phi > b / 2., phi - b, phi)
+    amp = p['ngon_corners'] * (1. / (np.cos(phi) + EPS) - 1.) + p['ngon_circle']
+    amp = amp / (r + EPS)
+    return w * x * amp, w * y * amp
+
+def ngon_ref(x, y, w, p, rand):
+    b = 2. * math.pi / p['ngon_sides']
+    r = (x*x + y*y) ** (p['ngon_power'] / 2.)
+    phi = math.atan2(y, x)
+    phi = phi - b * math.floor(phi / b)
+    if phi > b / 2.:
+        phi -= b
+    amp = p['ngon_corners'] * (1. / (math.cos(phi) + EPS) - 1.) + p['ngon_circle']
+    amp = amp / (r + EPS)
+    return w * x * amp, w * y * amp
+
+
+def curl(x, y, w, p, rand):
+    c1, c2 = p['curl_c1'], p['curl_c2']
+    re = 1. + c1 * x + c2 * (x*x - y*y)
+    im = c1 * y + 2. * c2 * x * y
+    r = w / (re*re + im*im)
+    return (x*re + y*im) * r, (y*re - x*im) * r
+
+def curl_ref(x, y, w, p, rand):
+    c1, c2 = p['curl_c1'], p['curl_c2']
+    re = 1. + c1 * x + c2 * (x*x - y*y)
+    im = c1 * y + 2. * c2 * x * y
+    r = w / (re*re + im*im)
+    return (x*re + y*im) * r, (y*re - x*im) * r
+
+
+def rectangles(x, y, w, p, rand):
+    rx, ry = p['rectangles_x'], p['rectangles_y']
+    with np.errstate(all='ignore'):
+        nx = np.where(rx == 0, x, (2. * np.floor(x / rx) + 1.) * rx - x)
+        ny = np.where(ry == 0, y, (2. * np.floor(y / ry) + 1.) * ry - y)
+    return w * nx, w * ny
+
+def rectangles_ref(x, y, w, p, rand):
+    rx, ry = p['rectangles_x'], p['rectangles_y']
+    nx = x if rx == 0 else (2. * math.floor(x / rx) + 1.) * rx - x
+    ny = y if ry == 0 else (2. * math.floor(y / ry) + 1.) * ry - y
+    return w * nx, w * ny
+
+
+def arch(x, y, w, p, rand):
+    a = rand[0] * w * math.pi
+    s = np.sin(a)
+    return w * s, w * s * s / np.cos(a)
+
+def arch_ref(x, y, w, p, rand):
+    a = rand[0] * w * math.pi
+    s = math.sin(a)
+    return w * s, w * s * s / math.cos(a)
+
+
+def tangent(x, y, w, p, rand):
+    return w * np.sin(x) / np.cos(y), w * np.tan(y)
+
+def tangent_ref(x, y, w, p, rand):
+    return w * math.sin(x) / math.cos(y), w * math.tan(y)
+
+
+def square(x, y, w, p, rand):
+    return w * (rand[0] - 0.5), w * (rand[1] - 0.5)
+
+def square_ref(x, y, w, p, rand):
+    return w * (rand[0] - 0.5), w * (rand[1] - 0.5)
+
+
+def rays(x, y, w, p, rand):
+    a = w * rand[0] * math.pi
+    r = w / (x*x + y*y + EPS)
+    t = w * np.tan(a) * r
+    return t * np.cos(x), t * np.sin(y)
+
+def rays_ref(x, y, w, p, rand):
+    a = w * rand[0] * math.pi
+    r = w / (x*x + y*y + EPS)
+    t = w * math.tan(a) * r
+    return t * math.cos(x), t * math.sin(y)
+
+
+def blade(x, y, w, p, rand):
+    r = rand[0] * w * np.sqrt(x*x + y*y)
+    s, c = np.sin(r), np.cos(r)
+    return w * x * (c + s), w * x * (c - s)
+
+def blade_ref(x, y, w, p, rand):
+    r = rand[0] * w * math.sqrt(x*x + y*y)
+    s, c = math.sin(r), math.cos(r)
+    return w * x * (c + s), w * x * (c - s)
+
+
+def secant2(x, y, w, p, rand):
+    c = np.cos(w * np.sqrt(x*x + y*y))
+    return w * x, w * np.where(c < 0, 1. / c + 1., 1. / c - 1.)
+
+def secant2_ref(x, y, w, p, rand):
+    c = math.cos(w * math.sqrt(x*x + y*y))
+    return w * x, w * (1. / c + 1. if c < 0 else 1. / c - 1.)
+
+
+def twintrian(x, y, w, p, rand):
+    r = rand[0] * w * np.sqrt(x*x + y*y)
+    s = np.sin(r)
+    diff = np.log10(s * s) + np.cos(r)
+    diff = np.where(np.isfinite(diff), diff, -30.)
+    return w * x * diff, w * x * (diff - s * math.pi)
+
+def twintrian_ref(x, y, w, p, rand):
+    r = rand[0] * w * math.sqrt(x*x + y*y)
+    s = math.sin(r)
+    diff = math.log10(s * s) + math.cos(r) if s else -30.
+    if math.isinf(diff) or math.isnan(diff):
+        diff = -30.
+    return w * x * diff, w * x * (diff - s * math.pi)
+
+
+def cross(x, y, w, p, rand):
+    s = x*x - y*y
+    r = w * np.sqrt(1. / (s*s + EPS))
+    return x * r, y * r
+
+def cross_ref(x, y, w, p, rand):
+    s = x*x - y*y
+    r = w * math.sqrt(1. / (s*s + EPS))
+    return x * r, y * r
+
+
+def _disc2(p):
+    add = p['disc2_twist']
+    sinadd, cosadd = math.sin(add), math.cos(add) - 1.
+    if add > 2. * math.pi:
+        k = 1. + add - 2. * math.pi
+        sinadd, cosadd = sinadd * k, cosadd * k
+    if add < -2. * math.pi:
+        k = 1. + add + 2. * math.pi
+        sinadd, cosadd = sinadd * k, cosadd * k
+    return p['disc2_rot'] * math.pi, sinadd, cosadd
+
+def disc2(x, y, w, p, rand):
+    timespi, sinadd, cosadd = _disc2(p)
+    t = timespi * (x + y)
+    r = w * np.arctan2(x, y) / math.pi
+    return (np.sin(t) + cosadd) * r, (np.cos(t) + sinadd) * r
+
+def disc2_ref(x, y, w, p, rand):
+    timespi, sinadd, cosadd = _disc2(p)
+    t = timespi * (x + y)
+    r = w * math.atan2(x, y) / math.pi
+    return (math.sin(t) + cosadd) * r, (math.cos(t) + sinadd) * r
+
+
+def super_shape(x, y, w, p, rand):
+    theta = p['super_shape_m'] / 4. * np.arctan2(y, x) + math.pi / 4.
+    t1 = np.abs(np.cos(theta)) ** p['super_shape_n2']
+    t2 = np.abs(np.sin(theta)) ** p['super_shape_n3']
+    rnd = p['super_shape_rnd']
+    sqrt = np.sqrt(x*x + y*y) + EPS
+    r = (w * ((rnd * rand[0] + (1. - rnd) * sqrt) - p['super_shape_holes']) *
+         (t1 + t2) ** (-1. / p['super_shape_n1']) / sqrt)
+    return r * x, r * y
+
+def super_shape_ref(x, y, w, p, rand):
+    theta = p['super_shape_m'] / 4. * math.atan2(y, x) + math.pi / 4.
+    t1 = abs(math.cos(theta)) ** p['super_shape_n2']
+    t2 = abs(math.sin(theta)) ** p['super_shape_n3']
+    rnd = p['super_shape_rnd']
+    sqrt = math.sqrt(x*x + y*y) + EPS
+    r = (w * ((rnd * rand[0] + (1. - rnd) * sqrt) - p['super_shape_holes']) *
+         (t1 + t2) ** (-1. / p['super_shape_n1']) / sqrt)
+    return r * x, r * y
+
+
+def flower(x, y, w, p, rand):
+    theta = np.arctan2(y, x)
+    r = (w * (rand[0] - p['flower_holes']) *
+         np.cos(p['flower_petals'] * theta) / (np.sqrt(x*x + y*y) + EPS))
+    return r * x, r * y
+
+def flower_ref(x, y, w, p, rand):
+    theta = math.atan2(y, x)
+    r = (w * (rand[0] - p['flower_holes']) *
+         math.cos(p['flower_petals'] * theta) / (math.sqrt(x*x + y*y) + EPS))
+    return r * x, r * y
+
+
+def conic(x, y, w, p, rand):
+    sqrt = np.sqrt(x*x + y*y) + EPS
+    e = p['conic_eccentricity']
+    r = w * (rand[0] - p['conic_holes']) * e / (1. + e * x / sqrt) / sqrt
+    return r * x, r * y
+
+def conic_ref(x, y, w, p, rand):
+    sqrt = math.sqrt(x*x + y*y) + EPS
+    e = p['conic_eccentricity']
+    r = w * (rand[0] - p['conic_holes']) * e / (1. + e * x / sqrt) / sqrt
+    return r * x, r * y
+
+
+def parabola(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y)
+    s, c = np.sin(r), np.cos(r)
+    return (p['parabola_height'] * w * s * s * rand[0],
+            p['parabola_width'] * w * c * rand[1])
+
+def parabola_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y)
+    s, c = math.sin(r), math.cos(r)
+    return (p['parabola_height'] * w * s * s * rand[0],
+            p['parabola_width'] * w * c * rand[1])
+
+
+def bent2(x, y, w, p, rand):
+    return (w * np.where(x < 0, x * p['bent2_x'], x),
+            w * np.where(y < 0, y * p['bent2_y'], y))
+
+def bent2_ref(x, y, w, p, rand):
+    return (w * (x * p['bent2_x'] if x < 0 else x),
+            w * (y * p['bent2_y'] if y < 0 else y))
+
+
+def bipolar(x, y, w, p, rand):
+    x2y2 = x*x + y*y
+    t = x2y2 + 1.
+    x2 = 2. * x
+    ny = 0.5 * np.arctan2(2. * y, x2y2 - 1.) - math.pi / 2. * p['bipolar_shift']
+    ny = np.where(ny > math.pi / 2.,
+                  -math.pi / 2. + np.fmod(ny + math.pi / 2., math.pi),
+                  np.where(ny < -math.pi / 2.,
+                           math.pi / 2. - np.fmod(math.pi / 2. - ny, math.pi),
+                           ny))
+    f = t + x2
+    g = t - x2
+    ok = (g != 0) & (f / np.where(g != 0, g, 1.) > 0)
+    nx = w * 0.25 * 2. / math.pi * np.log(np.where(ok, f / np.where(ok, g, 1.), 1.))
+    return np.where(ok, nx, 0.), np.where(ok, w * 2. / math.pi * ny, 0.)
+
+def bipolar_ref(x, y, w, p, rand):
+    x2y2 = x*x + y*y
+    t = x2y2 + 1.
+    x2 = 2. * x
+    ny = 0.5 * math.atan2(2. * y, x2y2 - 1.) - math.pi / 2. * p['bipolar_shift']
+    if ny > math.pi / 2.:
+        ny = -math.pi / 2. + math.fmod(ny + math.pi / 2., math.pi)
+    elif ny < -math.pi / 2.:
+        ny = math.pi / 2. - math.fmod(math.pi / 2. - ny, math.pi)
+    f = t + x2
+    g = t - x2
+    if g == 0 or f / g <= 0:
+        return 0., 0.
+    return w * 0.25 * 2. / math.pi * math.log(f / g), w * 2. / math.pi * ny
+
+
+def boarders(x, y, w, p, rand):
+    rx, ry = np.rint(x), np.rint(y)
+    offx, offy = x - rx, y - ry
+    with np.errstate(all='ignore'):
+        xmajor = np.abs(offx) >= np.abs(offy)
+        #x major side, pushed by a quarter towards the side the point is on
+        sx = np.where(offx >= 0, 0.25, -0.25)
+        sy = np.where(offy >= 0, 0.25, -0.25)
+        nx = np.where(xmajor, offx * 0.5 + rx + sx,
+                      offx * 0.5 + rx + offx / offy * sy)
+        ny = np.where(xmajor, offy * 0.5 + ry + offy / offx * sx,
+                      offy * 0.5 + ry + sy)
+    inner = rand[0] >= 0.75
+    nx = np.where(inner, offx * 0.5 + rx, nx)
+    ny = np.where(inner, offy * 0.5 + ry, ny)
+    return w * nx, w * ny
+
+def boarders_ref(x, y, w, p, rand):
+    rx, ry = float(round_half_even(x)), float(round_half_even(y))
+    offx, offy = x - rx, y - ry
+    if rand[0] >= 0.75:
+        return w * (offx * 0.5 + rx), w * (offy * 0.5 + ry)
+    if abs(offx) >= abs(offy):
+        sx = 0.25 if offx >= 0 else -0.25
+        return w * (offx * 0.5 + rx + sx), w * (offy * 0.5 + ry + offy / offx * sx)
+    else:
+        sy = 0.25 if offy >= 0 else -0.25
+        return w * (offx * 0.5 + rx + offx / offy * sy), w * (offy * 0.5 + ry + sy)
+
+
+def butterfly(x, y, w, p, rand):
+    wx = w * 1.3029400317411197908970256609023
+    y2 = 2. * y
+    r = wx * np.sqrt(np.abs(y * x) / (EPS + x*x + y2*y2))
+    return r * x, r * y2
+
+def butterfly_ref(x, y, w, p, rand):
+    wx = w * 1.3029400317411197908970256609023
+    y2 = 2. * y
+    r = wx * math.sqrt(abs(y * x) / (EPS + x*x + y2*y2))
+    return r * x, r * y2
+
+
+def cell(x, y, w, p, rand):
+    size = p['cell_size']
+    cx = np.floor(x / size)
+    cy = np.floor(y / size)
+    dx = x - cx * size
+    dy = y - cy * size
+    cx = np.where(cx >= 0, cx * 2., -(2. * cx + 1.))
+    cy = np.where(cy >= 0, cy * 2., -(2. * cy + 1.))
+    return w * (dx + cx * size), -w * (dy + cy * size)
+
+def cell_ref(x, y, w, p, rand):
+    size = p['cell_size']
+    cx = math.floor(x / size)
+    cy = math.floor(y / size)
+    dx = x - cx * size
+    dy = y - cy * size
+    cx = cx * 2. if cx >= 0 else -(2. * cx + 1.)
+    cy = cy * 2. if cy >= 0 else -(2. * cy + 1.)
+    return w * (dx + cx * size), -w * (dy + cy * size)
+
+
+def cpow(x, y, w, p, rand):
+    power = p['cpow_power']
+    a = np.arctan2(y, x)
+    lnr = 0.5 * np.log(x*x + y*y)
+    vc = p['cpow_r'] / power
+    vd = p['cpow_i'] / power
+    ang = vc * a + vd * lnr + 2. * math.pi / power * np.floor(power * rand[0])
+    m = w * np.exp(vc * lnr - vd * a)
+    return m * np.cos(ang), m * np.sin(ang)
+
+def cpow_ref(x, y, w, p, rand):
+    power = p['cpow_power']
+    a = math.atan2(y, x)
+    lnr = 0.5 * math.log(x*x + y*y)
+    vc = p['cpow_r'] / power
+    vd = p['cpow_i'] / power
+    ang = vc * a + vd * lnr + 2. * math.pi / power * math.floor(power * rand[0])
+    m = w * math.exp(vc * lnr - vd * a)
+    return m * math.cos(ang), m * math.sin(ang)
+
+
+def curve(x, y, w, p, rand):
+    xlen = max(p['curve_xlength'] ** 2, 1e-20)
+    ylen = max(p['curve_ylength'] ** 2, 1e-20)
+    return (w * (x + p['curve_xamp'] * np.exp(-y*y / xlen)),
+            w * (y + p['curve_yamp'] * np.exp(-x*x / ylen)))
+
+def curve_ref(x, y, w, p, rand):
+    xlen = max(p['curve_xlength'] ** 2, 1e-20)
+    ylen = max(p['curve_ylength'] ** 2, 1e-20)
+    return (w * (x + p['curve_xamp'] * math.exp(-y*y / xlen)),
+            w * (y + p['curve_yamp'] * math.exp(-x*x / ylen)))
+
+
+def edisc(x, y, w, p, rand):
+    t = x*x + y*y + 1.
+    x2 = 2. * x
+    xmax = (np.sqrt(t + x2) + np.sqrt(t - x2)) * 0.5
+    a1 = np.log(xmax + np.sqrt(xmax - 1.))
+    a2 = -np.arccos(x / xmax)
+    w = w / 11.57034632
+    snv = np.where(y > 0, -np.sin(a1), np.sin(a1))
+    return w * np.cosh(a2) * np.cos(a1), w * np.sinh(a2) * snv
+
+def edisc_ref(x, y, w, p, rand):
+    t = x*x + y*y + 1.
+    x2 = 2. * x
+    xmax = (math.sqrt(t + x2) + math.sqrt(t - x2)) * 0.5
+    a1 = math.log(xmax + math.sqrt(xmax - 1.))
+    a2 = -math.acos(x / xmax)
+    w = w / 11.57034632
+    snv = -math.sin(a1) if y > 0 else math.sin(a1)
+    return w * math.cosh(a2) * math.cos(a1), w * math.sinh(a2) * snv
+
+
+def elliptic(x, y, w, p, rand):
+    t = x*x + y*y + 1.
+    x2 = 2. * x
+    xmax = 0.5 * (np.sqrt(t + x2) + np.sqrt(t - x2))
+    a = x / xmax
+    b = np.sqrt(np.maximum(1. - a*a, 0.))
+    ssx = np.sqrt(np.maximum(xmax - 1., 0.))
+    w = w / (math.pi / 2.)
+    ny = w * np.log(xmax + ssx)
+    return w * np.arctan2(a, b), np.where(y > 0, ny, -ny)
+
+def elliptic_ref(x, y, w, p, rand):
+    t = x*x + y*y + 1.
+    x2 = 2. * x
+    xmax = 0.5 * (math.sqrt(t + x2) + math.sqrt(t - x2))
+    a = x / xmax
+    b = math.sqrt(max(1. - a*a, 0.))
+    ssx = math.sqrt(max(xmax - 1., 0.))
+    w = w / (math.pi / 2.)
+    ny = w * math.log(xmax + ssx)
+    return w * math.atan2(a, b), ny if y > 0 else -ny
+
+
+def escher(x, y, w, p, rand):
+    beta = p['escher_beta']
+    a = np.arctan2(y, x)
+    lnr = 0.5 * np.log(x*x + y*y)
+    vc = 0.5 * (1. + math.cos(beta))
+    vd = 0.5 * math.sin(beta)
+    m = w * np.exp(vc * lnr - vd * a)
+    n = vc * a + vd * lnr
+    return m * np.cos(n), m * np.sin(n)
+
+def escher_ref(x, y, w, p, rand):
+    beta = p['escher_beta']
+    a = math.atan2(y, x)
+    lnr = 0.5 * math.log(x*x + y*y)
+    vc = 0.5 * (1. + math.cos(beta))
+    vd = 0.5 * math.sin(beta)
+    m = w * math.exp(vc * lnr - vd * a)
+    n = vc * a + vd * lnr
+    return m * math.cos(n), m * math.sin(n)
+
+
+def foci(x, y, w, p, rand):
+    expx = np.exp(x) * 0.5
+    expnx = 0.25 / expx
+    t = w / (expx + expnx - np.cos(y))
+    return t * (expx - expnx), t * np.sin(y)
+
+def foci_ref(x, y, w, p, rand):
+    expx = math.exp(x) * 0.5
+    expnx = 0.25 / expx
+    t = w / (expx + expnx - math.cos(y))
+    return t * (expx - expnx), t * math.sin(y)
+
+
+def lazysusan(x, y, w, p, rand):
+    lx, ly = p['lazysusan_x'], p['lazysusan_y']
+    x = x - lx
+    y = y + ly
+    r = np.sqrt(x*x + y*y)
+    a = (np.arctan2(y, x) + p['lazysusan_spin'] +
+         p['lazysusan_twist'] * (w - r))
+    inside = r < w
+    with np.errstate(all='ignore'):
+        m = w * (1. + p['lazysusan_space'] / r)
+    return (np.where(inside, w * r * np.cos(a), m * x) + lx,
+            np.where(inside, w * r * np.sin(a), m * y) - ly)
+
+def lazysusan_ref(x, y, w, p, rand):
+    lx, ly = p['lazysusan_x'], p['lazysusan_y']
+    x = x - lx
+    y = y + ly
+    r = math.sqrt(x*x + y*y)
+    if r < w:
+        a = (math.atan2(y, x) + p['lazysusan_spin'] +
+             p['lazysusan_twist'] * (w - r))
+        return w * r * math.cos(a) + lx, w * r * math.sin(a) - ly
+    m = w * (1. + p['lazysusan_space'] / r)
+    return m * x + lx, m * y - ly
+
+
+def loonie(x, y, w, p, rand):
+    r2 = x*x + y*y
+    w2 = w * w
+    with np.errstate(all='ignore'):
+        r = np.where(r2 < w2, w * np.sqrt(w2 / r2 - 1.), w)
+    return r * x, r * y
+
+def loonie_ref(x, y, w, p, rand):
+    r2 = x*x + y*y
+    w2 = w * w
+    r = w * math.sqrt(w2 / r2 - 1.) if r2 < w2 else w
+    return r * x, r * y
+
+
+#pre_blur returns the moved point rather than a contribution
+def pre_blur(x, y, w, p, rand):
+    g = w * (rand[0] + rand[1] + rand[2] + rand[3] - 2.)
+    a = rand[4] * 2. * math.pi
+    return x + g * np.cos(a), y + g * np.sin(a)
+
+def pre_blur_ref(x, y, w, p, rand):
+    g = w * (rand[0] + rand[1] + rand[2] + rand[3] - 2.)
+    a = rand[4] * 2. * math.pi
+    return x + g * math.cos(a), y + g * math.sin(a)
+
+
+def modulus(x, y, w, p, rand):
+    mx, my = p['modulus_x'], p['modulus_y']
+    nx = np.where(x > mx, -mx + np.fmod(x + mx, 2. * mx),
+                  np.where(x < -mx, mx - np.fmod(mx - x, 2. * mx), x))
+    ny = np.where(y > my, -my + np.fmod(y + my, 2. * my),
+                  np.where(y < -my, my - np.fmod(my - y, 2. * my), y))
+    return w * nx, w * ny
+
+def modulus_ref(x, y, w, p, rand):
+    mx, my = p['modulus_x'], p['modulus_y']
+    if x > mx:
+        nx = -mx + math.fmod(x + mx, 2. * mx)
+    elif x < -mx:
+        nx = mx - math.fmod(mx - x, 2. * mx)
+    else:
+        nx = x
+    if y > my:
+        ny = -my + math.fmod(y + my, 2. * my)
+    elif y < -my:
+        ny = my - math.fmod(my - y, 2. * my)
+    else:
+        ny = y
+    return w * nx, w * ny
+
+
+def oscilloscope(x, y, w, p, rand):
+    tpf = 2. * math.pi * p['oscilloscope_frequency']
+    damping = p['oscilloscope_damping']
+    t = p['oscilloscope_amplitude'] * np.cos(tpf * x)
+    if damping:
+        t = t * np.exp(-np.abs(x) * damping)
+    t = t + p['oscilloscope_separation']
+    return w * x, np.where(np.abs(y) <= t, -w * y, w * y)
+
+def oscilloscope_ref(x, y, w, p, rand):
+    tpf = 2. * math.pi * p['oscilloscope_frequency']
+    damping = p['oscilloscope_damping']
+    t = p['oscilloscope_amplitude'] * math.cos(tpf * x)
+    if damping:
+        t = t * math.exp(-abs(x) * damping)
+    t = t + p['oscilloscope_separation']
+    return w * x, -w * y if abs(y) <= t else w * y
+
+
+def polar2(x, y, w, p, rand):
+    p2vv = w / math.pi
+    return p2vv * np.arctan2(x, y), 0.5 * p2vv * np.log(x*x + y*y)
+
+def polar2_ref(x, y, w, p, rand):
+    p2vv = w / math.pi
+    return p2vv * math.atan2(x, y), 0.5 * p2vv * math.log(x*x + y*y)
+
+
+def popcorn2(x, y, w, p, rand):
+    c = p['popcorn2_c']
+    return (w * (x + p['popcorn2_x'] * np.sin(np.tan(y * c))),
+            w * (y + p['popcorn2_y'] * np.sin(np.tan(x * c))))
+
+def popcorn2_ref(x, y, w, p, rand):
+    c = p['popcorn2_c']
+    return (w * (x + p['popcorn2_x'] * math.sin(math.tan(y * c))),
+            w * (y + p['popcorn2_y'] * math.sin(math.tan(x * c))))
+
+
+def scry(x, y, w, p, rand):
+    t = x*x + y*y
+    r = 1. / (np.sqrt(t) * (t + 1. / (w + EPS)))
+    return x * r, y * r
+
+def scry_ref(x, y, w, p, rand):
+    t = x*x + y*y
+    r = 1. / (math.sqrt(t) * (t + 1. / (w + EPS)))
+    return x * r, y * r
+
+
+def separation(x, y, w, p, rand):
+    sx2 = p['separation_x'] ** 2
+    sy2 = p['separation_y'] ** 2
+    xi, yi = p['separation_xinside'], p['separation_yinside']
+    return (np.where(x > 0, w * (np.sqrt(x*x + sx2) - x * xi),
+                     -w * (np.sqrt(x*x + sx2) + x * xi)),
+            np.where(y > 0, w * (np.sqrt(y*y + sy2) - y * yi),
+                     -w * (np.sqrt(y*y + sy2) + y * yi)))
+
+def separation_ref(x, y, w, p, rand):
+    sx2 = p['separation_x'] ** 2
+    sy2 = p['separation_y'] ** 2
+    xi, yi = p['separation_xinside'], p['separation_yinside']
+    if x > 0:
+        nx = w * (math.sqrt(x*x + sx2) - x * xi)
+    else:
+        nx = -w * (math.sqrt(x*x + sx2) + x * xi)
+    if y > 0:
+        ny = w * (math.sqrt(y*y + sy2) - y * yi)
+    else:
+        ny = -w * (math.sqrt(y*y + sy2) + y * yi)
+    return nx, ny
+
+
+def split(x, y, w, p, rand):
+    return (np.where(np.cos(y * p['split_ysize'] * math.pi) >= 0, w * x, -w * x),
+            np.where(np.cos(x * p['split_xsize'] * math.pi) >= 0, w * y, -w * y))
+
+def split_ref(x, y, w, p, rand):
+    return (w * x if math.cos(y * p['split_ysize'] * math.pi) >= 0 else -w * x,
+            w * y if math.cos(x * p['split_xsize'] * math.pi) >= 0 else -w * y)
+
+
+def splits(x, y, w, p, rand):
+    return (w * np.where(x >= 0, x + p['splits_x'], x - p['splits_x']),
+            w * np.where(y >= 0, y + p['splits_y'], y - p['splits_y']))
+
+def splits_ref(x, y, w, p, rand):
+    return (w * (x + p['splits_x'] if x >= 0 else x - p['splits_x']),
+            w * (y + p['splits_y'] if y >= 0 else y - p['splits_y']))
+
+
+def stripes(x, y, w, p, rand):
+    roundx = np.floor(x + 0.5)
+    offsetx = x - roundx
+    return (w * (offsetx * (1. - p['stripes_space']) + roundx),
+            w * (y + offsetx * offsetx * p['stripes_warp']))
+
+def stripes_ref(x, y, w, p, rand):
+    roundx = math.floor(x + 0.5)
+    offsetx = x - roundx
+    return (w * (offsetx * (1. - p['stripes_space']) + roundx),
+            w * (y + offsetx * offsetx * p['stripes_warp']))
+
+
+def wedge(x, y, w, p, rand):
+    count, angle = p['wedge_count'], p['wedge_angle']
+    r = np.sqrt(x*x + y*y)
+    a = np.arctan2(y, x) + p['wedge_swirl'] * r
+    c = np.floor((count * a + math.pi) / math.pi * 0.5)
+    a = a * (1. - angle * count / math.pi * 0.5) + c * angle
+    r = w * (r + p['wedge_hole'])
+    return r * np.cos(a), r * np.sin(a)
+
+def wedge_ref(x, y, w, p, rand):
+    count, angle = p['wedge_count'], p['wedge_angle']
+    r = math.sqrt(x*x + y*y)
+    a = math.atan2(y, x) + p['wedge_swirl'] * r
+    c = math.floor((count * a + math.pi) / math.pi * 0.5)
+    a = a * (1. - angle * count / math.pi * 0.5) + c * angle
+    r = w * (r + p['wedge_hole'])
+    return r * math.cos(a), r * math.sin(a)
+
+
+def wedge_julia(x, y, w, p, rand):
+    count, angle = p['wedge_julia_count'], p['wedge_julia_angle']
+    power = p['wedge_julia_power']
+    r = w * (x*x + y*y) ** (p['wedge_julia_dist'] / power / 2.)
+    n = np.trunc(abs(power) * rand[0])
+    a = (np.arctan2(y, x) + 2. * math.pi * n) / power
+    c = np.floor((count * a + math.pi) / math.pi * 0.5)
+    a = a * (1. - angle * count / math.pi * 0.5) + c * angle
+    return r * np.cos(a), r * np.sin(a)
+
+def wedge_julia_ref(x, y, w, p, rand):
+    count, angle = p['wedge_julia_count'], p['wedge_julia_angle']
+    power = p['wedge_julia_power']
+    r = w * (x*x + y*y) ** (p['wedge_julia_dist'] / power / 2.)
+    n = math.trunc(abs(power) * rand[0])
+    a = (math.atan2(y, x) + 2. * math.pi * n) / power
+    c = math.floor((count * a + math.pi) / math.pi * 0.5)
+    a = a * (1. - angle * count / math.pi * 0.5) + c * angle
+    return r * math.cos(a), r * math.sin(a)
+
+
+def wedge_sph(x, y, w, p, rand):
+    count, angle = p['wedge_sph_count'], p['wedge_sph_angle']
+    r = 1. / (np.sqrt(x*x + y*y) + EPS)
+    a = np.arctan2(y, x) + p['wedge_sph_swirl'] * r
+    c = np.floor((count * a + math.pi) / math.pi * 0.5)
+    a = a * (1. - angle * count / math.pi * 0.5) + c * angle
+    r = w * (r + p['wedge_sph_hole'])
+    return r * np.cos(a), r * np.sin(a)
+
+def wedge_sph_ref(x, y, w, p, rand):
+    count, angle = p['wedge_sph_count'], p['wedge_sph_angle']
+    r = 1. / (math.sqrt(x*x + y*y) + EPS)
+    a = math.atan2(y, x) + p['wedge_sph_swirl'] * r
+    c = math.floor((count * a + math.pi) / math.pi * 0.5)
+    a = a * (1. - angle * count / math.pi * 0.5) + c * angle
+    r = w * (r + p['wedge_sph_hole'])
+    return r * math.cos(a), r * math.sin(a)
+
+
+def whorl(x, y, w, p, rand):
+    r = np.sqrt(x*x + y*y)
+    a = np.arctan2(y, x) + np.where(r < w, p['whorl_inside'],
+                                    p['whorl_outside']) / (w - r)
+    return w * r * np.cos(a), w * r * np.sin(a)
+
+def whorl_ref(x, y, w, p, rand):
+    r = math.sqrt(x*x + y*y)
+    a = math.atan2(y, x) + (p['whorl_inside'] if r < w
+                            else p['whorl_outside']) / (w - r)
+    return w * r * math.cos(a), w * r * math.sin(a)
+
+
+def waves2(x, y, w, p, rand):
+    return (w * (x + p['waves2_scalex'] * np.sin(y * p['waves2_freqx'])),
+            w * (y + p['waves2_scaley'] * np.sin(x * p['waves2_freqy'])))
+
+def waves2_ref(x, y, w, p, rand):
+    return (w * (x + p['waves2_scalex'] * math.sin(y * p['waves2_freqx'])),
+            w * (y + p['waves2_scaley'] * math.sin(x * p['waves2_freqy'])))
+
+
+def exp(x, y, w, p, rand):
+    e = w * np.exp(x)
+    return e * np.cos(y), e * np.sin(y)
+
+def exp_ref(x, y, w, p, rand):
+    e = w * math.exp(x)
+    return e * math.cos(y), e * math.sin(y)
+
+
+def log(x, y, w, p, rand):
+    return w * 0.5 * np.log(x*x + y*y), w * np.arctan2(y, x)
+
+def log_ref(x, y, w, p, rand):
+    return w * 0.5 * math.log(x*x + y*y), w * math.atan2(y, x)
+
+
+def sin(x, y, w, p, rand):
+    return w * np.sin(x) * np.cosh(y), w * np.cos(x) * np.sinh(y)
+
+def sin_ref(x, y, w, p, rand):
+    return w * math.sin(x) * math.cosh(y), w * math.cos(x) * math.sinh(y)
+
+
+def cos(x, y, w, p, rand):
+    return w * np.cos(x) * np.cosh(y), -w * np.sin(x) * np.sinh(y)
+
+def cos_ref(x, y, w, p, rand):
+    return w * math.cos(x) * math.cosh(y), -w * math.sin(x) * math.sinh(y)
+
+
+def tan(x, y, w, p, rand):
+    d = w / (np.cos(2. * x) + np.cosh(2. * y))
+    return d * np.sin(2. * x), d * np.sinh(2. * y)
+
+def tan_ref(x, y, w, p, rand):
+    d = w / (math.cos(2. * x) + math.cosh(2. * y))
+    return d * math.sin(2. * x), d * math.sinh(2. * y)
+
+
+def sec(x, y, w, p, rand):
+    d = 2. * w / (np.cos(2. * x) + np.cosh(2. * y))
+    return d * np.cos(x) * np.cosh(y), d * np.sin(x) * np.sinh(y)
+
+def sec_ref(x, y, w, p, rand):
+    d = 2. * w / (math.cos(2. * x) + math.cosh(2. * y))
+    return d * math.cos(x) * math.cosh(y), d * math.sin(x) * math.sinh(y)
+
+
+def csc(x, y, w, p, rand):
+    d = 2. * w / (np.cosh(2. * y) - np.cos(2. * x))
+    return d * np.sin(x) * np.cosh(y), -d * np.cos(x) * np.sinh(y)
+
+def csc_ref(x, y, w, p, rand):
+    d = 2. * w / (math.cosh(2. * y) - math.cos(2. * x))
+    return d * math.sin(x) * math.cosh(y), -d * math.cos(x) * math.sinh(y)
+
+
+def cot(x, y, w, p, rand):
+    d = w / (np.cosh(2. * y) - np.cos(2. * x))
+    return d * np.sin(2. * x), -d * np.sinh(2. * y)
+
+def cot_ref(x, y, w, p, rand):
+    d = w / (math.cosh(2. * y) - math.cos(2. * x))
+    return d * math.sin(2. * x), -d * math.sinh(2. * y)
+
+
+def sinh(x, y, w, p, rand):
+    return w * np.sinh(x) * np.cos(y), w * np.cosh(x) * np.sin(y)
+
+def sinh_ref(x, y, w, p, rand):
+    return w * math.sinh(x) * math.cos(y), w * math.cosh(x) * math.sin(y)
+
+
+def cosh(x, y, w, p, rand):
+    return w * np.cosh(x) * np.cos(y), w * np.sinh(x) * np.sin(y)
+
+def cosh_ref(x, y, w, p, rand):
+    return w * math.cosh(x) * math.cos(y), w * math.sinh(x) * math.sin(y)
+
+
+def tanh(x, y, w, p, rand):
+    d = w / (np.cos(2. * y) + np.cosh(2. * x))
+    return d * np.sinh(2. * x), d * np.sin(2. * y)
+
+def tanh_ref(x, y, w, p, rand):
+    d = w / (math.cos(2. * y) + math.cosh(2. * x))
+    return d * math.sinh(2. * x), d * math.sin(2. * y)
+
+
+def sech(x, y, w, p, rand):
+    d = 2. * w / (np.cos(2. * y) + np.cosh(2. * x))
+    return d * np.cos(y) * np.cosh(x), -d * np.sin(y) * np.sinh(x)
+
+def sech_ref(x, y, w, p, rand):
+    d = 2. * w / (math.cos(2. * y) + math.cosh(2. * x))
+    return d * math.cos(y) * math.cosh(x), -d * math.sin(y) * math.sinh(x)
+
+
+def csch(x, y, w, p, rand):
+    d = 2. * w / (np.cosh(2. * x) - np.cos(2. * y))
+    return d * np.sinh(x) * np.cos(y), -d * np.cosh(x) * np.sin(y)
+
+def csch_ref(x, y, w, p, rand):
+    d = 2. * w / (math.cosh(2. * x) - math.cos(2. * y))
+    return d * math.sinh(x) * math.cos(y), -d * math.cosh(x) * math.sin(y)
+
+
+def coth(x, y, w, p, rand):
+    d = w / (np.cosh(2. * x) - np.cos(2. * y))
+    return d * np.sinh(2. * x), d * np.sin(2. * y)
+
+def coth_ref(x, y, w, p, rand):
+    d = w / (math.cosh(2. * x) - math.cos(2. * y))
+    return d * math.sinh(2. * x), d * math.sin(2. * y)
+
+
+def auger(x, y, w, p, rand):
+    freq, scale = p['auger_freq'], p['auger_scale']
+    s = np.sin(freq * x)
+    t = np.sin(freq * y)
+    dy = y + p['auger_weight'] * (scale * s / 2. + np.abs(y) * s)
+    dx = x + p['auger_weight'] * (scale * t / 2. + np.abs(x) * t)
+    return w * (x + p['auger_sym'] * (dx - x)), w * dy
+
+def auger_ref(x, y, w, p, rand):
+    freq, scale = p['auger_freq'], p['auger_scale']
+    s = math.sin(freq * x)
+    t = math.sin(freq * y)
+    dy = y + p['auger_weight'] * (scale * s / 2. + abs(y) * s)
+    dx = x + p['auger_weight'] * (scale * t / 2. + abs(x) * t)
+    return w * (x + p['auger_sym'] * (dx - x)), w * dy
+
+
+def flux(x, y, w, p, rand):
+    xpw = x + w
+    xmw = x - w
+    r = (w * (2. + p['flux_spread']) *
+         np.sqrt(np.sqrt(y*y + xpw*xpw) / np.sqrt(y*y + xmw*xmw)))
+    a = (np.arctan2(y, xmw) - np.arctan2(y, xpw)) * 0.5
+    return r * np.cos(a), r * np.sin(a)
+
+def flux_ref(x, y, w, p, rand):
+    xpw = x + w
+    xmw = x - w
+    r = (w * (2. + p['flux_spread']) *
+         math.sqrt(math.sqrt(y*y + xpw*xpw) / math.sqrt(y*y + xmw*xmw)))
+    a = (math.atan2(y, xmw) - math.atan2(y, xpw)) * 0.5
+    return r * math.cos(a), r * math.sin(a)
+
+
+def _mobius(x, y, w, p):
+    re_u = p['mobius_re_a'] * x - p['mobius_im_a'] * y + p['mobius_re_b']
+    im_u = p['mobius_re_a'] * y + p['mobius_im_a'] * x + p['mobius_im_b']
+    re_v = p['mobius_re_c'] * x - p['mobius_im_c'] * y + p['mobius_re_d']
+    im_v = p['mobius_re_c'] * y + p['mobius_im_c'] * x + p['mobius_im_d']
+    r = w / (re_v * re_v + im_v * im_v)
+    return r * (re_u * re_v + im_u * im_v), r * (im_u * re_v - re_u * im_v)
+
+def mobius(x, y, w, p, rand):
+    return _mobius(x, y, w, p)
+
+def mobius_ref(x, y, w, p, rand):
+    return _mobius(x, y, w, p)
+
+
+kernels = {
+        VAR_LINEAR: Kernel(linear, linear_ref),
+        VAR_SINUSOIDAL: Kernel(sinusoidal, sinusoidal_ref),
+        VAR_SPHERICAL: Kernel(spherical, spherical_ref),
+        VAR_SWIRL: Kernel(swirl, swirl_ref),
+        VAR_HORSESHOE: Kernel(horseshoe, horseshoe_ref),
+        VAR_POLAR: Kernel(polar, polar_ref),
+        VAR_HANDKERCHIEF: Kernel(handkerchief, handkerchief_ref),
+        VAR_HEART: Kernel(heart, heart_ref),
+        VAR_DISC: Kernel(disc, disc_ref),
+        VAR_SPIRAL: Kernel(spiral, spiral_ref),
+        VAR_HYPERBOLIC: Kernel(hyperbolic, hyperbolic_ref),
+        VAR_DIAMOND: Kernel(diamond, diamond_ref),
+        VAR_EX: Kernel(ex, ex_ref),
+        VAR_JULIA: Kernel(julia, julia_ref, nrand=1),
+        VAR_BENT: Kernel(bent, bent_ref),
+        VAR_WAVES: Kernel(waves, waves_ref),
+        VAR_FISHEYE: Kernel(fisheye, fisheye_ref),
+        VAR_POPCORN: Kernel(popcorn, popcorn_ref),
+        VAR_EXPONENTIAL: Kernel(exponential, exponential_ref),
+        VAR_POWER: Kernel(power, power_ref),
+        VAR_COSINE: Kernel(cosine, cosine_ref),
+        VAR_RINGS: Kernel(rings, rings_ref),
+        VAR_FAN: Kernel(fan, fan_ref),
+        VAR_BLOB: Kernel(blob, blob_ref),
+        VAR_PDJ: Kernel(pdj, pdj_ref),
+        VAR_FAN2: Kernel(fan2, fan2_ref),
+        VAR_RINGS2: Kernel(rings2, rings2_ref),
+        VAR_EYEFISH: Kernel(eyefish, eyefish_ref),
+        VAR_BUBBLE: Kernel(bubble, bubble_ref),
+        VAR_CYLINDER: Kernel(cylinder, cylinder_ref),
+        VAR_PERSPECTIVE: Kernel(perspective, perspective_ref),
+        VAR_NOISE: Kernel(noise, noise_ref, nrand=2),
+        VAR_JULIAN: Kernel(julian, julian_ref, nrand=1),
+        VAR_JULIASCOPE: Kernel(juliascope, juliascope_ref, nrand=1),
+        VAR_BLUR: Kernel(blur, blur_ref, nrand=2),
+        VAR_GAUSSIAN_BLUR: Kernel(gaussian_blur, gaussian_blur_ref, nrand=5),
+        VAR_RADIAL_BLUR: Kernel(radial_blur, radial_blur_ref, nrand=4),
+        VAR_PIE: Kernel(pie, pie_ref, nrand=3),
+        VAR_NGON: Kernel(ngon, ngon_ref),
+        VAR_CURL: Kernel(curl, curl_ref),
+        VAR_RECTANGLES: Kernel(rectangles, rectangles_ref),
+        VAR_ARCH: Kernel(arch, arch_ref, nrand=1),
+        VAR_TANGENT: Kernel(tangent, tangent_ref),
+        VAR_SQUARE: Kernel(square, square_ref, nrand=2),
+        VAR_RAYS: Kernel(rays, rays_ref, nrand=1),
+        VAR_BLADE: Kernel(blade, blade_ref, nrand=1),
+        VAR_SECANT2: Kernel(secant2, secant2_ref),
+        VAR_TWINTRIAN: Kernel(twintrian, twintrian_ref, nrand=1),
+        VAR_CROSS: Kernel(cross, cross_ref),
+        VAR_DISC2: Kernel(disc2, disc2_ref),
+        VAR_SUPER_SHAPE: Kernel(super_shape, super_shape_ref, nrand=1),
+        VAR_FLOWER: Kernel(flower, flower_ref, nrand=1),
+        VAR_CONIC: Kernel(conic, conic_ref, nrand=1),
+        VAR_PARABOLA: Kernel(parabola, parabola_ref, nrand=2),
+        VAR_BENT2: Kernel(bent2, bent2_ref),
+        VAR_BIPOLAR: Kernel(bipolar, bipolar_ref),
+        VAR_BOARDERS: Kernel(boarders, boarders_ref, nrand=1),
+        VAR_BUTTERFLY: Kernel(butterfly, butterfly_ref),
+        VAR_CELL: Kernel(cell, cell_ref),
+        VAR_CPOW: Kernel(cpow, cpow_ref, nrand=1),
+        VAR_CURVE: Kernel(curve, curve_ref),
+        VAR_EDISC: Kernel(edisc, edisc_ref),
+        VAR_ELLIPTIC: Kernel(elliptic, elliptic_ref),
+        VAR_ESCHER: Kernel(escher, escher_ref),
+        VAR_FOCI: Kernel(foci, foci_ref),
+        VAR_LAZYSUSAN: Kernel(lazysusan, lazysusan_ref),
+        VAR_LOONIE: Kernel(loonie, loonie_ref),
+        VAR_PRE_BLUR: Kernel(pre_blur, pre_blur_ref, nrand=5, pre=True),
+        VAR_MODULUS: Kernel(modulus, modulus_ref),
+        VAR_OSCILLOSCOPE: Kernel(oscilloscope, oscilloscope_ref),
+        VAR_POLAR2: Kernel(polar2, polar2_ref),
+        VAR_POPCORN2: Kernel(popcorn2, popcorn2_ref),
+        VAR_SCRY: Kernel(scry, scry_ref),
+        VAR_SEPARATION: Kernel(separation, separation_ref),
+        VAR_SPLIT: Kernel(split, split_ref),
+        VAR_SPLITS: Kernel(splits, splits_ref),
+        VAR_STRIPES: Kernel(stripes, stripes_ref),
+        VAR_WEDGE: Kernel(wedge, wedge_ref),
+        VAR_WEDGE_JULIA: Kernel(wedge_julia, wedge_julia_ref, nrand=1),
+        VAR_WEDGE_SPH: Kernel(wedge_sph, wedge_sph_ref),
+        VAR_WHORL: Kernel(whorl, whorl_ref),
+        VAR_WAVES2: Kernel(waves2, waves2_ref),
+        VAR_EXP: Kernel(exp, exp_ref),
+        VAR_LOG: Kernel(log, log_ref),
+        VAR_SIN: Kernel(sin, sin_ref),
+        VAR_COS: Kernel(cos, cos_ref),
+        VAR_TAN: Kernel(tan, tan_ref),
+        VAR_SEC: Kernel(sec, sec_ref),
+        VAR_CSC: Kernel(csc, csc_ref),
+        VAR_COT: Kernel(cot, cot_ref),
+        VAR_SINH: Kernel(sinh, sinh_ref),
+        VAR_COSH: Kernel(cosh, cosh_ref),
+        VAR_TANH: Kernel(tanh, tanh_ref),
+        VAR_SECH: Kernel(sech, sech_ref),
+        VAR_CSCH: Kernel(csch, csch_ref),
+        VAR_COTH: Kernel(coth, coth_ref),
+        VAR_AUGER: Kernel(auger, auger_ref),
+        VAR_FLUX: Kernel(flux, flux_ref),
+        VAR_MOBIUS: Kernel(mobius, mobius_ref),
+        }
+
+
+def round_half_even(v):
+    #what np.rint does, so boarders_ref matches boarders
+    r = math.floor(v + 0.5)
+    if r - v == 0.5 and r % 2:
+        r -= 1
+    return r
+
+
+def verify(var_id, n=1000, seed=0, w=0.75, p=None, spread=2.):
+    #Largest difference between a kernel's batched and scalar versions on n
+    #random points, nan where only one of them is finite.
+    kernel = kernels[var_id]
+    rng = np.random.RandomState(seed)
+    x = rng.uniform(-spread, spread, n)
+    y = rng.uniform(-spread, spread, n)
+    rand = rng.random_sample((kernel.nrand, n))
+    if p is None:
+        p = dict((name, variable_defaults.get(name, 0.))
+                 for name in variable_list)
+        p['coefs'] = (1., 0., 0., 1., 0.3, -0.2)
+    with np.errstate(all='ignore'):
+        bx, by = kernel.batched(x, y, w, p, rand)
+        bx, by = np.broadcast_to(bx, x.shape), np.broadcast_to(by, x.shape)
+    worst = 0.
+    for j in xrange(n):
+        try:
+            sx, sy = kernel.scalar(float(x[j]), float(y[j]), w, p,
+                                   tuple(rand[:, j].tolist()))
+        except (ValueError, ZeroDivisionError, OverflowError):
+            sx = sy = float('nan')
+        for a, b in ((bx[j], sx), (by[j], sy)):
+            if np.isfinite(a) and np.isfinite(b):
+                worst = max(worst, abs(a - b) / max(1., abs(b)))
+            elif np.isfinite(a) or np.isfinite(b):
+                return float('nan')
+    return worst
@@ -0,0 +1,239 @@
+import numpy as np
+
+from flame import Xform
+from kernels import EPS, variable_defaults
+from plan import IDENTITY
+from table import COLUMNS, XformTable
+from utils import rect_array
+from variations import variations
+
+#flame attributes that are never interpolated
+FIXED = ('time', 'width', 'height', 'oversample', 'name')
+#attributes Flame keeps out of its XML that are interpolated anyway
+MOVING = ('x_offset', 'y_offset', 'scale')
+
+
+class Keyframes(object):
+    #In-between frames of a sequence of flames, such as the flames of a
+    #Flames, at their time attributes (or one apart if those don't increase).
+    #Every key is padded to the same number of xforms, the padding fading in
+    #from weight 0, and everything is interpolated for all xforms and all
+    #output frames at once:
+    #  - coefs and post coefs in the space named by the interpolation_type of
+    #    the key a segment starts at: 'linear' interpolates them as they
+    #    are, 'log' the x and y pairs as log length and angle and anything
+    #    else as length and angle, the o pair always linearly.
+    #  - variation weights and variables, weight, color, color_speed,
+    #    opacity, chaos, the palette and numeric flame attributes linearly.
+    #The interpolation attribute of that key picks how: 'linear', or
+    #'smooth' for Catmull-Rom through the neighbouring keys. Each output
+    #frame takes everything else, LFOs and the final xform included, from
+    #the key its segment starts at, and LFOs run over the whole sequence.
+    def __init__(self, flames):
+        if hasattr(flames, 'iter_flames'):
+            flames = list(flames.iter_flames())
+        self.flames = list(flames)
+        if not self.flames:
+            raise ValueError('Needs at least one flame')
+        times = np.array([float(getattr(flame, 'time', 0.))
+                          for flame in self.flames])
+        if len(times) > 1 and (np.diff(times) <= 0).any():
+            times = np.arange(len(times), dtype=float)
+        self.times = times
+        self.nxforms = max(len(flame.xforms) for flame in self.flames)
+        n = self.nxforms
+        tables = [XformTable(flame) for flame in self.flames]
+        self.coefs = np.array([_pad(t.coefs, n, IDENTITY) for t in tables])
+        self.post = np.array([_pad(t.post, n, IDENTITY) for t in tables])
+        self.columns = dict((name, np.array([_pad(getattr(t, name), n, 0.)
+                                             for t in tables]))
+                            for name, default in COLUMNS)
+        padding = np.zeros(tables[0].variations.shape[1])
+        padding[variations['linear']] = 1.
+        self.variations = np.array([_pad(t.variations, n, padding)
+                                    for t in tables])
+        names = set()
+        for t in tables:
+            names.update(t.variables)
+        self.variables = {}
+        for name in names:
+            default = variable_defaults.get(name, 0.)
+            rows = []
+            for flame in self.flames:
+                rows.append([float(getattr(xform, name))
+                             if name in xform.__dict__ else default
+                             for xform in flame.xforms])
+            self.variables[name] = np.array([_pad(row, n, default)
+                                             for row in rows])
+        self.chaos = np.ones((len(tables), n, n))
+        for k, t in enumerate(tables):
+            self.chaos[k, :len(t), :len(t)] = t.chaos
+        self.palettes = np.array([flame.palette.array
+                                  for flame in self.flames])
+        self.attributes = _numeric_attributes(self.flames)
+        self.modes = [getattr(flame, 'interpolation_type', 'log')
+                      for flame in self.flames]
+        self.smooth = np.array([getattr(flame, 'interpolation', 'linear')
+                                == 'smooth' for flame in self.flames])
+        self._templates = {}
+
+    def frame_times(self, nframes):
+        #nframes times evenly spread from the first key to the last
+        if nframes == 1:
+            return self.times[:1].copy()
+        return np.linspace(self.times[0], self.times[-1], nframes)
+
+    def weights(self, times):
+        #Returns (segment, w), the key each time's segment starts at and a
+        #len(times) x keys matrix of how much each key contributes
+        times = np.asarray(times, dtype=float)
+        nkeys = len(self.times)
+        w = np.zeros((len(times), nkeys))
+        if nkeys == 1:
+            w[:, 0] = 1.
+            return np.zeros(len(times), dtype=np.intp), w
+        segment = np.clip(np.searchsorted(self.times, times, 'right') - 1,
+                          0, nkeys - 2)
+        start = self.times[segment]
+        u = np.clip((times - start) / (self.times[segment + 1] - start), 0, 1)
+        rows = np.arange(len(times))
+        linear = ~self.smooth[segment]
+        w[rows[linear], segment[linear]] = 1. - u[linear]
+        w[rows[linear], segment[linear] + 1] = u[linear]
+        smooth = ~linear
+        if smooth.any():
+            u, s, r = u[smooth], segment[smooth], rows[smooth]
+            u2, u3 = u*u, u*u*u
+            catmull_rom = ((-u3 + 2*u2 - u) / 2., (3*u3 - 5*u2 + 2) / 2.,
+                           (-3*u3 + 4*u2 + u) / 2., (u3 - u2) / 2.)
+            for offset, c in zip((-1, 0, 1, 2), catmull_rom):
+                np.add.at(w, (r, np.clip(s + offset, 0, nkeys - 1)), c)
+        return segment, w
+
+    def interpolate(self, times):
+        #Everything interpolated at each of times, as a dict of arrays with
+        #the output frames along the first axis
+        segment, w = self.weights(times)
+        rtn = {
+                'segment': segment,
+                'coefs': self._coefs(self.coefs, segment, w),
+                'post': self._coefs(self.post, segment, w),
+                'variations': _blend(w, self.variations),
+                'chaos': _blend(w, self.chaos),
+                'palette': np.clip(_blend(w, self.palettes), 0., 255.),
+                'variables': dict((name, _blend(w, v))
+                                  for name, v in self.variables.iteritems()),
+                'attributes': dict((name, _blend(w, v))
+                                   for name, v in self.attributes.iteritems()),
+                }
+        for name, column in self.columns.iteritems():
+            rtn[name] = _blend(w, column)
+        return rtn
+
+    def _coefs(self, coefs, segment, w):
+        #keys x xforms x 6 coefs interpolated to frames x xforms x 6
+        rtn = _blend(w, coefs)
+        modes = np.array([self.modes[k] for k in segment])
+        polar = modes != 'linear'
+        if not polar.any():
+            return rtn
+        x = coefs[..., 0:4:2]
+        y = coefs[..., 1:4:2]
+        lengths = np.maximum(np.hypot(x, y), EPS)
+        #angles unwrapped from key to key so they turn the short way round
+        angles = np.degrees(np.unwrap(np.arctan2(y, x), axis=0))
+        log = modes[polar] == 'log'
+        wp = w[polar]
+        l = np.where(log[:, None, None], np.exp(_blend(wp, np.log(lengths))),
+                     _blend(wp, lengths))
+        t = _blend(wp, angles)
+        px, py = rect_array(l, t)
+        rtn[polar, :, 0:4:2] = px
+        rtn[polar, :, 1:4:2] = py
+        #the round trip through polar form isn't exact
+        return _snap(w, coefs, rtn)
+
+    def template(self, k):
+        #A copy of key k padded to nxforms xforms, output frames of segment
+        #k are written into it
+        if k not in self._templates:
+            flame = self.flames[k].copy()
+            while len(flame.xforms) < self.nxforms:
+                flame.xforms.append(Xform(flame))
+            self._templates[k] = flame
+        return self._templates[k]
+
+    def iter_flames(self, nframes):
+        #Yields each output frame as a Flame. A Flame is reused for every
+        #frame of a segment, so copy it to keep it.
+        values = self.interpolate(self.frame_times(nframes))
+        for n in xrange(nframes):
+            yield self._frame(values, n)
+
+    def iter_strings(self, nframes):
+        #Serialized output frames with LFOs applied, n/nframes of the way
+        #through their cycles
+        for n, flame in enumerate(self.iter_flames(nframes)):
+            yield flame.string_at(n / float(nframes))
+
+    def iter_elements(self, nframes):
+        for n, flame in enumerate(self.iter_flames(nframes)):
+            yield flame.get_at(n / float(nframes))
+
+    def _frame(self, values, n):
+        flame = self.template(values['segment'][n])
+        table = flame.to_table()
+        table.coefs[:] = values['coefs'][n]
+        table.post[:] = values['post'][n]
+        for name, default in COLUMNS:
+            getattr(table, name)[:] = values[name][n]
+        table.variations[:] = values['variations'][n]
+        table.variables = dict((name, v[n])
+                               for name, v in values['variables'].iteritems())
+        table.chaos[:] = values['chaos'][n]
+        table.apply(flame)
+        flame.palette.array = values['palette'][n]
+        for name, v in values['attributes'].iteritems():
+            setattr(flame, name, v[n].tolist() if v.ndim > 1 else float(v[n]))
+        return flame
+
+
+def _pad(rows, n, fill):
+    #rows padded with copies of fill up to n of them
+    rows = np.asarray(rows, dtype=float)
+    if len(rows) == n:
+        return rows
+    fill = np.broadcast_to(np.asarray(fill, dtype=float),
+                           (n - len(rows),) + rows.shape[1:])
+    if not len(rows):
+        return fill.copy()
+    return np.concatenate([rows, fill])
+
+def _blend(w, keys):
+    #frames x keys weights applied to keys x ... arrays
+    return _snap(w, keys, np.tensordot(w, keys, axes=1))
+
+def _snap(w, keys, blended):
+    #blended with frames that fall on a key set to exactly that key, and
+    #values all keys agree on to exactly that value, so rounding in the
+    #weights never turns an identity post or a default into a near miss
+    rtn = np.where((keys == keys[:1]).all(axis=0), keys[0], blended)
+    on_key = (w == 1.).any(axis=1) & ((w == 0.).sum(axis=1) == w.shape[1] - 1)
+    rtn[on_key] = keys[w[on_key].argmax(axis=1)]
+    return rtn
+
+def _numeric_attributes(flames):
+    #name -> keys x ... array of flame attributes numeric in every key
+    rtn = {}
+    for name in flames[0].__dict__:
+        if name[0] == '_' or name in FIXED:
+            continue
+        if name in flames[0]._never_write and name not in MOVING:
+            continue
+        try:
+            values = np.array([flame.__dict__[name] for flame in flames],
+                              dtype=float)
+        except (KeyError, TypeError, ValueError):
+            continue
+        rtn[name] = values
+    return rtn
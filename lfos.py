@@ -1,5 +1,6 @@
 import math
-from utils import normalize
+import numpy as np
+from utils import normalize, normalize_array
 
 def sin(i, amp, phase=0):
     i = normalize(i)
@@ -32,3 +33,47 @@ def triangle(i, amp, phase=0):
     else:
         return amp * 2 * (1 - i)
 
+#fractions of a cycle, after phase, where each shape jumps instead of
+#moving smoothly
+DISCONTINUITIES = {
+        'saw_up': (0.,),
+        'saw_down': (0.,),
+        'square': (0., 0.5),
+        }
+
+def jumps(shape, i0, i1, freq, phase=0):
+    #Whether shape jumps somewhere between times i0 and i1, the times the
+    #plans pass it before multiplying by freq
+    phase = normalize(phase, 360)
+    x0, x1 = sorted((i0 * freq + phase/360., i1 * freq + phase/360.))
+    return any(math.floor(x1 - at) > math.floor(x0 - at)
+               for at in DISCONTINUITIES.get(shape, ()))
+
+
+#Array variants of the shapes above. i is an array of times and every
+#value is computed in one call.
+
+def sin_array(i, amp, phase=0):
+    i = normalize_array(i)
+    phase = normalize(phase, 360) - 90
+    return (0.5 * amp * np.sin((i * 2 * np.pi) + math.radians(phase))) + (0.5 * amp)
+
+def saw_up_array(i, amp, phase=0):
+    phase = normalize(phase, 360)
+    i = normalize_array(i + phase/360.)
+    return amp * i
+
+def saw_down_array(i, amp, phase=0):
+    phase = normalize(phase, 360)
+    i = normalize_array(i + phase/360.)
+    return amp * (1 - i)
+
+def square_array(i, amp, phase=0):
+    phase = normalize(phase, 360)
+    i = normalize_array(i + phase/360.)
+    return np.where(i < 0.5, 0., float(amp))
+
+def triangle_array(i, amp, phase=0):
+    phase = normalize(phase, 360)
+    i = normalize_array(i + phase/360.)
+    return amp * 2 * np.where(i < 0.5, i, 1 - i)
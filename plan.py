@@ -0,0 +1,215 @@
+import hashlib
+import numpy as np
+import lfos
+from utils import rect
+import writer
+
+#LFO targets that move a pair of coefs around the origin instead of adding
+#to a value. Maps target -> (coefs group, affected axes).
+#Groups are 0 for the xform coefs and 1 for the post coefs, axes are
+#0 for x, 1 for y and 2 for o.
+ROTATIONS = {
+        'rotate': (0, (0, 1)),
+        'rotate_x': (0, (0,)),
+        'rotate_y': (0, (1,)),
+        'orbit': (0, (2,)),
+        'protate': (1, (0, 1)),
+        'protate_x': (1, (0,)),
+        'protate_y': (1, (1,)),
+        'porbit': (1, (2,)),
+        }
+
+IDENTITY = (1., 0., 0., 1., 0., 0.)
+IDENTITY_POLARS = ((1., 0.), (1., 90.), (0., 0.))
+
+
+class AnimationPlan(object):
+    #Everything Flame.get_at needs that doesn't change from frame to frame,
+    #resolved once. Only the LFO driven values are computed per frame.
+    #After an edit refresh only rebuilds the xforms that were touched, the
+    #others keep their plans and, with memoize, their serialized frames.
+    #Assignments mark what they touch dirty, stale catches lists edited in
+    #place: the xforms, an xform's LFOs and the palette colors.
+    def __init__(self, flame, memoize=False):
+        self.flame = flame
+        self.memoize = memoize
+        self.xforms = []
+        self._build_static()
+        self.refresh()
+
+    def refresh(self):
+        flame = self.flame
+        final = flame.final
+        if (flame.__dict__.get('_static') or self._final is not final or
+                final is not None and final.__dict__.get('_dirty') or
+                not np.array_equal(flame.palette.array, self._palette)):
+            self._build_static()
+        kept = dict((id(xform.xform), xform) for xform in self.xforms)
+        xforms = []
+        for xform in flame.xforms:
+            plan = kept.get(id(xform))
+            if (plan is None or xform.__dict__.get('_dirty') or
+                    not _same(xform.lfos, plan.lfos)):
+                plan = XformPlan(xform, self.memoize)
+            xforms.append(plan)
+        self.xforms = xforms
+        for xform in flame.xforms + [final]:
+            _clean(xform)
+        flame.__dict__['_dirty'] = False
+        flame.__dict__['_static'] = False
+        self._digest = None
+
+    def jumps(self, i0, i1):
+        #Whether an LFO jumps between times i0 and i1 instead of moving
+        #smoothly, as square and saw shapes do once a cycle
+        for xform in self.xforms:
+            for lfo in xform.scalars + xform.angles:
+                method, freq, amp, phase = lfo[:4]
+                if amp and lfos.jumps(method.__name__, i0, i1, freq, phase):
+                    return True
+        return False
+
+    def stale(self):
+        #Whether something was edited in place since the last refresh
+        flame = self.flame
+        if not _same(flame.xforms, [xform.xform for xform in self.xforms]):
+            return True
+        for xform in self.xforms:
+            if not _same(xform.xform.lfos, xform.lfos):
+                return True
+        return not np.array_equal(flame.palette.array, self._palette)
+
+    def _build_static(self):
+        flame = self.flame
+        self.attrib = dict((k, writer.format_value(v))
+                for k, v in flame._iter_attributes())
+        self._final = flame.final
+        if flame.final is not None:
+            self.final = flame.final.to_element(print_lfos=False)
+        else:
+            self.final = None
+        self.colors = flame.palette.to_elements()
+        self._palette = flame.palette.array.copy()
+        #everything around the xforms of a serialized frame
+        self.head = '<flame{0}>'.format(writer.attributes(self.attrib))
+        tail = []
+        if flame.final is not None:
+            tail.append(writer.xform_string(flame.final, print_lfos=False))
+        tail.append(writer.palette_string(flame.palette))
+        tail.append('</flame>')
+        self.tail = ''.join(tail)
+
+    def get_at(self, i, rotate=0.):
+        return [xform.get_at(i, rotate) for xform in self.xforms]
+
+    def string_at(self, i, rotate=0.):
+        parts = [self.head]
+        parts.extend(xform.string_at(i, rotate) for xform in self.xforms)
+        parts.append(self.tail)
+        return ''.join(parts)
+
+    def write(self, values):
+        #Serialized frame for per xform values as returned by get_at
+        parts = [self.head]
+        parts.extend(xform.writer.write(v)
+                     for xform, v in zip(self.xforms, values))
+        parts.append(self.tail)
+        return ''.join(parts)
+
+    def digest(self):
+        #sha1 of everything in a frame besides the values get_at computes,
+        #so that and those values identify the frame
+        if self._digest is None:
+            sha = hashlib.sha1(self.head)
+            sha.update(self.tail)
+            for xform in self.xforms:
+                sha.update(repr((xform.writer.head,
+                                 [slot[:3] for slot in xform.writer.slots])))
+            self._digest = sha.hexdigest()
+        return self._digest
+
+
+def _same(a, b):
+    #Whether lists a and b hold the very same objects
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+def _clean(xform):
+    #Marks xform and its post as matching their plans again
+    if xform is not None:
+        xform.__dict__['_dirty'] = False
+        if xform.post:
+            xform.post.__dict__['_dirty'] = False
+
+
+class XformPlan(object):
+    def __init__(self, xform, memoize=False):
+        self.xform = xform
+        self.lfos = list(xform.lfos)
+        #(i, rotate) -> serialized frame, when memoizing
+        self.memo = {} if memoize else None
+        self.animate = bool(xform.animate)
+        self.coefs = tuple(xform.coefs)
+        if xform.post:
+            self.post = tuple(xform.post.coefs)
+        else:
+            self.post = None
+        #polar form of x, y and o for coefs and post
+        self.polars = (
+                xform.polars,
+                xform.post.polars if xform.post else IDENTITY_POLARS,
+                )
+        #name -> base value for additive targets
+        self.bases = {}
+        #(function, freq, amp, phase, target) for additive targets
+        self.scalars = []
+        #(function, freq, amp, phase, group, axes) for rotation targets
+        self.angles = []
+        for lfo in xform.lfos:
+            if not lfo.isactive():
+                continue
+            args = (getattr(lfos, lfo.shape), lfo.freq, lfo.amp, lfo.phase)
+            if lfo.target in ROTATIONS:
+                self.angles.append(args + ROTATIONS[lfo.target])
+            else:
+                self.bases[lfo.target] = getattr(xform, lfo.target)
+                self.scalars.append(args + (lfo.target,))
+        self.writer = writer.XformWriter(xform, self.bases)
+
+    def get_at(self, i, rotate=0.):
+        values = dict(self.bases)
+        for method, freq, amp, phase, target in self.scalars:
+            values[target] += method(i*freq, amp, phase)
+        if not self.animate:
+            rotate = 0.
+        if self.angles or rotate:
+            offsets = ([rotate, rotate, 0.], [0., 0., 0.])
+            for method, freq, amp, phase, group, axes in self.angles:
+                deg = method(i*freq, amp, phase)
+                for axis in axes:
+                    offsets[group][axis] += deg
+            values['coefs'] = self._rotated(self.coefs, 0, offsets[0])
+            if self.post is not None or any(offsets[1]):
+                values['post'] = self._rotated(
+                        self.post or IDENTITY, 1, offsets[1])
+        return values
+
+    def string_at(self, i, rotate=0.):
+        if self.memo is None:
+            return self.writer.write(self.get_at(i, rotate))
+        key = (i, rotate)
+        try:
+            return self.memo[key]
+        except KeyError:
+            rtn = self.memo[key] = self.writer.write(self.get_at(i, rotate))
+            return rtn
+
+    def _rotated(self, coefs, group, offsets):
+        rtn = []
+        for axis, deg in enumerate(offsets):
+            if deg:
+                l, t = self.polars[group][axis]
+                rtn.extend(rect((l, t + deg)))
+            else:
+                rtn.extend(coefs[axis*2:axis*2+2])
+        return tuple(rtn)
+
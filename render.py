@@ -0,0 +1,344 @@
+import math
+import multiprocessing
+import numpy as np
+from alias import XformSelector
+from flame import Flame
+from kernels import kernels, params, variable_defaults
+from table import XformTable
+from tonemap import tonemap
+from utils import NFRAMES, frame_at
+from variations import variable_list, variations
+
+#iterations run on fresh points before anything gets plotted
+FUSE = 20
+#points iterated together
+BATCH = 10000
+#histograms this many times bigger than a batch of points are updated
+#sparsely instead of with full size bincounts
+SPARSE = 16
+#iterations points carried over from the previous frame of a loop get
+WARM = 3
+#largest change of any xform parameter across an LFO jump that points still
+#carry over
+JUMP = 0.05
+#fractions of the sample budget progressive renders produce images at
+CHECKPOINTS = (0.01, 0.1, 1.)
+
+
+def sample_budget(flame):
+    #quality is the number of samples per output pixel
+    return int(flame.quality * flame.width * flame.height)
+
+def render(flame, samples=None, seed=None, filename=None):
+    #Accumulation histogram of flame after samples points have been plotted.
+    #With filename the histogram is a memmap of that file.
+    histogram = None
+    if filename is not None:
+        histogram = mapped_histogram(flame, filename)
+    renderer = Renderer(flame, seed, histogram=histogram)
+    renderer.iterate(sample_budget(flame) if samples is None else samples)
+    return renderer.histogram
+
+def render_progressive(flame, checkpoints=CHECKPOINTS, threshold=None,
+                       seed=None, bits=8):
+    #Yields (samples, image) at each checkpoint fraction of the sample budget,
+    #all from the same histogram. With a threshold it stops early once the
+    #mean change between successive images, as a fraction of full scale,
+    #drops below it. Stop iterating to abandon the render.
+    renderer = Renderer(flame, seed)
+    return renderer.progressive(sample_budget(flame), checkpoints, threshold,
+                                bits)
+
+def render_loop(flame, nframes=NFRAMES, samples=None, seed=None, bits=8,
+                jump=JUMP):
+    #Yields the image of each frame of flame's loop. Every frame starts from
+    #the points of the one before, so it only needs WARM iterations instead
+    #of FUSE. Smooth changes always carry, however fast the loop moves.
+    #Where an LFO jumps between two frames the points only carry if no
+    #parameter moved by more than jump.
+    plan = flame.plan
+    previous = None
+    for n in xrange(nframes):
+        frame = Flame(frame_at(flame, n, nframes))
+        renderer = Renderer(frame, None if seed is None else [seed, n])
+        if previous is not None:
+            if plan.jumps((n - 1) / float(nframes), n / float(nframes)):
+                renderer.carry(previous, jump)
+            else:
+                renderer.carry(previous, None)
+        renderer.iterate(sample_budget(frame) if samples is None else samples)
+        yield renderer.image(bits)
+        previous = renderer
+
+def render_parallel(flame, samples=None, seed=None, workers=None):
+    #Like render, with the samples split across worker processes. Worker k
+    #draws from its own stream seeded with (seed, k) and accumulates into its
+    #own histogram in shared memory, which are summed in order at the end,
+    #so a given flame, seed and number of workers always gives the same
+    #histogram.
+    if samples is None:
+        samples = sample_budget(flame)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if seed is None:
+        seed = np.random.randint(2**31)
+    shape = histogram_shape(flame)
+    size = shape[0] * shape[1] * shape[2]
+    buffers = [multiprocessing.RawArray('d', size) for k in xrange(workers)]
+    shares = [(k, samples // workers + (k < samples % workers), seed)
+              for k in xrange(workers)]
+    pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                initargs=(flame, buffers, shape))
+    try:
+        pool.map(_render_share, shares, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    histogram = np.zeros(shape)
+    for buf in buffers:
+        histogram += np.frombuffer(buf).reshape(shape)
+    return histogram
+
+def mapped_histogram(flame, filename, dtype=np.float32, mode='w+'):
+    #A histogram backed by filename, for renders that don't fit in memory.
+    #mode='r' opens an existing one for tone mapping.
+    return np.memmap(filename, dtype=dtype, mode=mode,
+                     shape=histogram_shape(flame))
+
+def histogram_shape(flame):
+    oversample = int(getattr(flame, 'oversample', 1))
+    return (int(flame.height) * oversample, int(flame.width) * oversample, 4)
+
+#set in each worker process by _init_worker
+_worker = {}
+
+def _init_worker(flame, buffers, shape):
+    _worker['flame'] = flame
+    _worker['buffers'] = buffers
+    _worker['shape'] = shape
+
+def _render_share(share):
+    k, samples, seed = share
+    histogram = np.frombuffer(_worker['buffers'][k]).reshape(_worker['shape'])
+    renderer = Renderer(_worker['flame'], [seed, k], histogram=histogram)
+    renderer.iterate(samples)
+    return renderer.samples
+
+def render_image(flame, samples=None, seed=None, bits=8):
+    renderer = Renderer(flame, seed)
+    renderer.iterate(sample_budget(flame) if samples is None else samples)
+    return renderer.image(bits)
+
+
+class XformOp(object):
+    #An xform resolved for iterating batches of points
+    def __init__(self, xform):
+        self.coefs = tuple(xform.coefs)
+        if xform.post:
+            self.post = tuple(xform.post.coefs)
+        else:
+            self.post = None
+        self.params = params(xform)
+        self.pre = []
+        self.vars = []
+        for name in xform.list_vars():
+            w = float(getattr(xform, name))
+            if not w:
+                continue
+            kernel = kernels[variations[name]]
+            if kernel.pre:
+                self.pre.append((kernel, w))
+            else:
+                self.vars.append((kernel, w))
+        self.weight = float(getattr(xform, 'weight', 1.))
+        self.color = float(getattr(xform, 'color', 0.))
+        self.color_speed = float(getattr(xform, 'color_speed', 0.5))
+        self.opacity = float(getattr(xform, 'opacity', 1.))
+
+    def apply(self, x, y, c, rng):
+        xx, xy, yx, yy, ox, oy = self.coefs
+        tx = xx*x + yx*y + ox
+        ty = xy*x + yy*y + oy
+        for kernel, w in self.pre:
+            tx, ty = kernel.batched(tx, ty, w, self.params,
+                                    rng.random_sample((kernel.nrand, len(x))))
+        nx = np.zeros_like(tx)
+        ny = np.zeros_like(ty)
+        for kernel, w in self.vars:
+            dx, dy = kernel.batched(tx, ty, w, self.params,
+                                    rng.random_sample((kernel.nrand, len(x))))
+            nx += dx
+            ny += dy
+        if self.post is not None:
+            xx, xy, yx, yy, ox, oy = self.post
+            nx, ny = xx*nx + yx*ny + ox, xy*nx + yy*ny + oy
+        c = c * (1. - self.color_speed) + self.color * self.color_speed
+        return nx, ny, c
+
+
+class Renderer(object):
+    #Runs the chaos game for a flame on batches of points and accumulates
+    #them into an rgba histogram of size * oversample.
+    def __init__(self, flame, seed=None, batch=BATCH, histogram=None):
+        self.flame = flame
+        self.rng = np.random.RandomState(seed)
+        self.batch = batch
+        self.xforms = [XformOp(xform) for xform in flame.xforms]
+        if flame.final is not None:
+            self.final = XformOp(flame.final)
+        else:
+            self.final = None
+        self.selector = XformSelector(flame)
+        self.palette = flame.palette.array / 255.
+        oversample = int(getattr(flame, 'oversample', 1))
+        self.height, self.width = histogram_shape(flame)[:2]
+        #pixels per unit, flame.scale is stored relative to the width
+        self.ppu = flame.scale * flame.width * 0.01 * oversample
+        self.center = flame.center
+        rotate = math.radians(getattr(flame, 'rotate', 0.))
+        self.rotation = math.cos(rotate), math.sin(rotate)
+        #accumulated into in place, so it can be shared memory
+        if histogram is None:
+            histogram = np.zeros(histogram_shape(flame))
+        self.histogram = histogram
+        self.samples = 0
+        self.points = None
+        self._parameters = None
+
+    def reset(self):
+        #New random points, iterated FUSE times so they're on the attractor
+        n = self.batch
+        #x, y, color, opacity and the last xform applied
+        self.points = (self.rng.uniform(-1., 1., n),
+                       self.rng.uniform(-1., 1., n),
+                       self.rng.random_sample(n),
+                       np.ones(n),
+                       np.full(n, -1, dtype=np.intp))
+        self.warmup(FUSE)
+
+    def carry(self, other, jump=JUMP):
+        #Starts from the points of other, the renderer of the previous frame,
+        #with a short warmup. Falls back to reset when the xforms changed too
+        #much for those points to be near the new attractor, or with jump
+        #None only when the number of xforms changed. Returns whether the
+        #points were carried over.
+        if (other.points is None or len(other.xforms) != len(self.xforms) or
+                jump is not None and
+                np.abs(self.parameters() - other.parameters()).max() > jump):
+            self.reset()
+            return False
+        self.points = tuple(a.copy() for a in other.points)
+        self.warmup(WARM)
+        return True
+
+    def parameters(self):
+        #Coefs, post coefs, weight, variation weights and every variation
+        #variable of every xform, one row each, unset variables at their
+        #default
+        if self._parameters is None:
+            table = XformTable(self.flame)
+            unset = np.ones((len(table), 1))
+            variables = [table.variables[name][:, None]
+                         if name in table.variables
+                         else unset * variable_defaults.get(name, 0.)
+                         for name in variable_list]
+            self._parameters = np.hstack([table.coefs, table.post,
+                                          table.weight[:, None],
+                                          table.variations] + variables)
+        return self._parameters
+
+    def image(self, bits=8):
+        #The histogram so far, tone mapped
+        return tonemap(self.flame, self.histogram, self.samples, bits)
+
+    def progressive(self, budget, checkpoints=CHECKPOINTS, threshold=None,
+                    bits=8):
+        #Iterates up to each checkpoint fraction of budget in turn and yields
+        #(samples, image), see render_progressive
+        maxval = 255. if bits == 8 else 65535.
+        previous = None
+        for fraction in sorted(checkpoints):
+            target = int(math.ceil(fraction * budget))
+            if target > self.samples:
+                self.iterate(target - self.samples)
+            image = self.image(bits)
+            yield self.samples, image
+            if threshold is not None and previous is not None:
+                change = np.abs(image - previous.astype(float)).mean() / maxval
+                if change < threshold:
+                    return
+            previous = image
+
+    def warmup(self, iterations):
+        for i in xrange(iterations):
+            self.step()
+
+    def iterate(self, samples):
+        #Plots samples more points into the histogram
+        if self.points is None:
+            self.reset()
+        while samples > 0:
+            self.step()
+            self.plot(min(samples, self.batch))
+            samples -= self.batch
+
+    def step(self):
+        x, y, c, o, last = self.points
+        n = len(x)
+        chosen = self.selector.next(last, self.rng.random_sample(n))
+        nx, ny, nc, no = (np.empty(n), np.empty(n), np.empty(n), np.empty(n))
+        with np.errstate(all='ignore'):
+            for j, xform in enumerate(self.xforms):
+                mask = chosen == j
+                if not mask.any():
+                    continue
+                nx[mask], ny[mask], nc[mask] = xform.apply(
+                        x[mask], y[mask], c[mask], self.rng)
+                no[mask] = xform.opacity
+        #points that escaped to infinity start over somewhere random
+        bad = ~(np.isfinite(nx) & np.isfinite(ny))
+        if bad.any():
+            count = bad.sum()
+            nx[bad] = self.rng.uniform(-1., 1., count)
+            ny[bad] = self.rng.uniform(-1., 1., count)
+        self.points = nx, ny, nc, no, chosen
+
+    def plot(self, n):
+        x, y, c, o = (a[:n] for a in self.points[:4])
+        if self.final is not None:
+            with np.errstate(all='ignore'):
+                x, y, c = self.final.apply(x, y, c, self.rng)
+        cos, sin = self.rotation
+        x = x - self.center[0]
+        y = y - self.center[1]
+        x, y = x*cos + y*sin, y*cos - x*sin
+        with np.errstate(all='ignore'):
+            col = np.floor(x * self.ppu + self.width / 2.)
+            row = np.floor(y * self.ppu + self.height / 2.)
+        inside = ((col >= 0) & (col < self.width) &
+                  (row >= 0) & (row < self.height))
+        index = (row[inside] * self.width + col[inside]).astype(np.intp)
+        color = np.clip((c[inside] * 255).astype(int), 0, 255)
+        rgba = np.empty((len(index), 4))
+        rgba[:, :3] = self.palette[color]
+        rgba[:, 3] = 1.
+        rgba *= o[inside][:, None]
+        self.accumulate(index, rgba)
+        self.samples += n
+
+    def accumulate(self, index, rgba):
+        histogram = self.histogram.reshape(-1, 4)
+        size = len(histogram)
+        if size < SPARSE * len(index):
+            for channel in xrange(4):
+                histogram[:, channel] += np.bincount(
+                        index, weights=rgba[:, channel], minlength=size)
+            return
+        #Sum the points per bucket and then touch only those buckets, in
+        #memory order, so a memmap is walked page by page.
+        buckets, inverse = np.unique(index, return_inverse=True)
+        sums = np.empty((len(buckets), 4))
+        for channel in xrange(4):
+            sums[:, channel] = np.bincount(inverse, weights=rgba[:, channel],
+                                           minlength=len(buckets))
+        histogram[buckets] += sums
@@ -0,0 +1,76 @@
+import numpy as np
+from kernels import variable_defaults
+from variations import variations, variable_list
+from plan import IDENTITY
+
+#per-xform scalar columns and the value used when an xform doesn't have one
+COLUMNS = (
+        ('weight', 1.),
+        ('color', 0.),
+        ('color_speed', 0.5),
+        ('opacity', 1.),
+        )
+
+
+class XformTable(object):
+    #Struct of arrays copy of a flame's xforms. Row j is xform j, so whole
+    #columns can be edited or animated at once and written back with apply.
+    def __init__(self, flame):
+        xforms = flame.xforms
+        n = len(xforms)
+        self.coefs = np.array([xform.coefs for xform in xforms],
+                              dtype=float).reshape(n, 6)
+        self.post = np.array([xform.post.coefs if xform.post else IDENTITY
+                              for xform in xforms], dtype=float).reshape(n, 6)
+        for name, default in COLUMNS:
+            setattr(self, name, np.array(
+                [getattr(xform, name, default) for xform in xforms],
+                dtype=float))
+        #xforms x 99 variation weights, indexed by variation id
+        self.variations = np.zeros((n, len(variations)))
+        for j, xform in enumerate(xforms):
+            for name in xform.list_vars():
+                self.variations[j, variations[name]] = getattr(xform, name)
+        #name -> column for every variable set on at least one xform, the
+        #xforms that don't set it at its default
+        self.variables = {}
+        for j, xform in enumerate(xforms):
+            for name in variable_list:
+                if name in xform.__dict__:
+                    if name not in self.variables:
+                        self.variables[name] = np.full(
+                                n, variable_defaults.get(name, 0.))
+                    self.variables[name][j] = getattr(xform, name)
+        #chaos[j, k] multiplies the chance of going from xform j to xform k
+        self.chaos = np.ones((n, n))
+        for j, xform in enumerate(xforms):
+            if xform.chaos is not None:
+                value = xform.chaos.value[:n]
+                self.chaos[j, :len(value)] = value
+
+    def __len__(self):
+        return len(self.coefs)
+
+    def apply(self, flame):
+        #Writes the table back to flame's xforms
+        #avoids a circular import, flame imports this module
+        from flame import Chaos, format_value
+        for j, xform in enumerate(flame.xforms):
+            xform.coefs = tuple(self.coefs[j].tolist())
+            if xform.post or not np.array_equal(self.post[j], IDENTITY):
+                xform.add_post(tuple(self.post[j].tolist()))
+            #values that were never set are left alone while at their default
+            for name, default in COLUMNS:
+                v = getattr(self, name)[j]
+                if v != default or name in xform.__dict__:
+                    setattr(xform, name, float(v))
+            for name, index in variations.iteritems():
+                v = self.variations[j, index]
+                if v or name in xform.__dict__:
+                    setattr(xform, name, float(v))
+            for name, column in self.variables.iteritems():
+                if (column[j] != variable_defaults.get(name, 0.) or
+                        name in xform.__dict__):
+                    setattr(xform, name, float(column[j]))
+            if xform.chaos is not None or (self.chaos[j] != 1).any():
+                xform.chaos = Chaos(xform, format_value(self.chaos[j].tolist()))
@@ -0,0 +1,64 @@
+import unittest
+import xml.etree.cElementTree as ET
+
+import numpy as np
+
+from alias import XformSelector
+from flame import Flame
+
+FLAME = '''<flame name="alias" size="16 16" center="0 0" scale="4"
+    brightness="4" gamma="4">
+  <xform weight="1" color="0" coefs="1 0 0 1 0 0" linear="1"
+      chaos="1 0 1" />
+  <xform weight="2" color="0" coefs="1 0 0 1 0 0" linear="1" />
+  <xform weight="3" color="0" coefs="1 0 0 1 0 0" linear="1"
+      chaos="0 1 0" />
+  <color index="0" rgb="255 0 0" />
+</flame>'''
+SAMPLES = 60000
+
+
+class SelectorTest(unittest.TestCase):
+    def setUp(self):
+        self.flame = Flame(ET.fromstring(FLAME))
+        self.selector = XformSelector(self.flame)
+        self.u = np.random.RandomState(0).random_sample(SAMPLES)
+
+    def frequencies(self, picks):
+        return np.bincount(picks, minlength=3) / float(len(picks))
+
+    def test_weights(self):
+        picks = self.selector.first(self.u)
+        self.assertTrue(np.allclose(self.frequencies(picks),
+                                    [1/6., 2/6., 3/6.], atol=0.01))
+
+    def test_chaos(self):
+        after = lambda j: self.selector.next(np.full(SAMPLES, j, np.intp),
+                                             self.u)
+        #a zero in a chaos row means that transition never happens
+        self.assertTrue(np.allclose(self.frequencies(after(0)),
+                                    [1/4., 0., 3/4.], atol=0.01))
+        self.assertTrue(np.array_equal(self.frequencies(after(2)),
+                                       [0., 1., 0.]))
+        #rows without chaos follow the weights
+        self.assertTrue(np.allclose(self.frequencies(after(1)),
+                                    [1/6., 2/6., 3/6.], atol=0.01))
+
+    def test_no_previous_xform(self):
+        current = np.full(SAMPLES, -1, np.intp)
+        self.assertTrue(np.array_equal(self.selector.next(current, self.u),
+                                       self.selector.first(self.u)))
+
+    def test_edits_rebuild_tables(self):
+        self.flame.xforms[0].weight = 0.
+        self.flame.xforms[1].weight = 3.
+        self.assertTrue(np.allclose(
+                self.frequencies(self.selector.first(self.u)),
+                [0., 0.5, 0.5], atol=0.01))
+        self.flame.xforms[2].chaos.value = (1., 0., 1.)
+        after = self.selector.next(np.full(SAMPLES, 2, np.intp), self.u)
+        self.assertTrue(np.array_equal(self.frequencies(after), [0., 0., 1.]))
+
+
+if __name__ == '__main__':
+    unittest.main()
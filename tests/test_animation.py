@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from animation import Animation, write
+from bench import make_flame
+from flame import Flame
+from utils import frame_string
+
+
+class AnimationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'loop.anim')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_frames_match_loop(self):
+        for seed in xrange(3):
+            flame = Flame(make_flame(xforms=3, lfos=2, seed=seed))
+            write(flame, self.filename, 8)
+            animation = Animation(self.filename)
+            self.assertEqual(len(animation), 8)
+            for n in xrange(8):
+                self.assertEqual(animation.string_at(n),
+                                 frame_string(flame, n, 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+import xml.etree.cElementTree as ET
+
+from cache import FrameCache
+from flame import Flame
+
+FLAME = '''<flame name="cache" size="64 64" center="0 0" scale="20"
+    brightness="4" gamma="4">
+  <xform weight="0.5" color="0" coefs="0.9 0.2 -0.3 0.8 0.1 0" linear="1">
+    <lfo target="rotate" shape="sin" freq="1" amp="30" phase="0" />
+  </xform>
+  <xform weight="0.5" color="1" coefs="0.5 0 0 0.5 -0.1 0" spherical="0.5">
+    <lfo target="weight" shape="square" freq="1" amp="0.25" phase="0" />
+  </xform>
+  <color index="0" rgb="255 0 0" />
+  <color index="1" rgb="0 0 255" />
+</flame>'''
+NFRAMES = 10
+
+
+class FrameCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.flame = Flame(ET.fromstring(FLAME))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def keys(self, cache):
+        plan = self.flame.plan
+        return [cache.key(plan, plan.get_at(n / float(NFRAMES), 36. * n))
+                for n in xrange(NFRAMES)]
+
+    def test_hit_matches_flame(self):
+        cache = FrameCache(self.directory)
+        expected = self.flame.string_at(0.3, 45.)
+        self.assertEqual(cache.string_at(self.flame, 0.3, 45.), expected)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        #the second time it comes from the file
+        self.assertEqual(cache.string_at(self.flame, 0.3, 45.), expected)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_lfo_edit_changes_its_frames_only(self):
+        cache = FrameCache(self.directory)
+        before = self.keys(cache)
+        self.assertEqual(len(set(before)), NFRAMES)
+        #the square is only at amp in the second half of the loop
+        self.flame.xforms[1].lfos[0].amp = 0.5
+        after = self.keys(cache)
+        for n in xrange(NFRAMES):
+            if n < NFRAMES // 2:
+                self.assertEqual(after[n], before[n])
+            else:
+                self.assertNotEqual(after[n], before[n])
+
+    def frame(self, cache, n):
+        #Frame n through the cache, returns its file name
+        i = n / float(NFRAMES)
+        cache.string_at(self.flame, i)
+        return cache.key(self.flame.plan, self.flame.plan.get_at(i))
+
+    def test_evicts_least_recently_used(self):
+        size = len(self.flame.string_at(0.))
+        cache = FrameCache(self.directory, max_bytes=int(size * 3.5))
+        names = [self.frame(cache, n) for n in xrange(3)]
+        #used in order, long ago
+        for age, name in enumerate(names):
+            os.utime(os.path.join(self.directory, name),
+                     (1000 + age, 1000 + age))
+        #a hit makes frame 0 the most recently used, so 1 goes first
+        self.frame(cache, 0)
+        names.append(self.frame(cache, 3))
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         sorted(names[:1] + names[2:]))
+        for n in xrange(4, NFRAMES):
+            self.frame(cache, n)
+            total = sum(os.path.getsize(os.path.join(self.directory, name))
+                        for name in os.listdir(self.directory))
+            self.assertTrue(total <= cache.max_bytes)
+            self.assertEqual(cache.size(), total)
+
+if __name__ == '__main__':
+    unittest.main()
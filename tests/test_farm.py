@@ -0,0 +1,52 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from farm import dispatch
+
+
+class DispatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_frame_order(self):
+        #later frames finish first
+        command = ['sh', '-c', 'sleep 0.0$((9 - {n})); cat; echo {n}']
+        frames = ['frame{0}\n'.format(n) for n in xrange(8)]
+        self.assertEqual(list(dispatch(frames, command, workers=4)),
+                         ['frame{0}\n{0}\n'.format(n) for n in xrange(8)])
+
+    def test_retries(self):
+        #fails the first time it sees each frame
+        seen = os.path.join(self.directory, '{n}')
+        command = ['sh', '-c',
+                   'if [ -e {0} ]; then cat; else touch {0}; exit 1; fi'
+                   .format(seen)]
+        self.assertEqual(list(dispatch(['a', 'b'], command, workers=2,
+                                       retries=1)),
+                         ['a', 'b'])
+
+    def test_failing_frame_raises(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            list(dispatch(['a', 'b'], ['false'], workers=2, retries=1))
+
+    def test_inflight(self):
+        pulled = []
+        def frames():
+            for n in xrange(20):
+                pulled.append(n)
+                yield str(n)
+        for k, output in enumerate(dispatch(frames(), ['cat'], workers=2,
+                                            inflight=3)):
+            self.assertEqual(output, str(k))
+            self.assertTrue(len(pulled) <= k + 3)
+        self.assertEqual(len(pulled), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
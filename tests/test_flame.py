@@ -0,0 +1,80 @@
+import unittest
+import xml.etree.cElementTree as ET
+
+from bench import make_flame
+from flame import Chaos, Flame
+from utils import rect
+
+
+class CopyTest(unittest.TestCase):
+    def setUp(self):
+        self.flame = Flame(make_flame(xforms=3, lfos=2))
+        self.flame.string_at(0.)
+
+    def test_added_xform_copy(self):
+        xform = self.flame.xforms[1].copy()
+        self.flame.xforms.append(xform)
+        self.flame.string_at(0.)
+        xform.weight = 5.
+        self.assertEqual(len(self.flame.plan.xforms), 4)
+        fresh = Flame(ET.fromstring(self.flame.to_string()))
+        self.assertEqual(self.flame.string_at(0.5), fresh.string_at(0.5))
+
+    def test_palette_is_copied_on_write(self):
+        original = self.flame.palette.array.copy()
+        copy = self.flame.copy()
+        copy.palette[0].rgb = (7, 7, 7)
+        self.flame.palette[1].rgb = (1, 2, 3)
+        self.assertEqual(copy.palette[0].rgb, (7., 7., 7.))
+        self.assertEqual(self.flame.palette[0].rgb, tuple(original[0]))
+        self.assertEqual(copy.palette[1].rgb, tuple(original[1]))
+
+    def test_shared_palette_is_read_only(self):
+        copy = self.flame.copy()
+        for flame in (self.flame, copy):
+            with self.assertRaises(ValueError):
+                flame.palette.array[0] = (7, 7, 7)
+        self.assertNotEqual(copy.palette[0].rgb, (7., 7., 7.))
+        #assigning a whole array still works
+        copy.palette.array = copy.palette.array * 0.5
+        copy.palette.array[0] = (7, 7, 7)
+        self.assertNotEqual(self.flame.palette[0].rgb, (7., 7., 7.))
+
+
+class PolarTest(unittest.TestCase):
+    def xforms(self):
+        #fresh xforms and posts whose polar forms were never read
+        flame = Flame(make_flame(xforms=2))
+        xform = flame.xforms[1]
+        xform.add_post((0.5, 0.1, -0.2, 0.5, 0.3, 0.))
+        flame = Flame(ET.fromstring(flame.to_string()))
+        return flame.xforms[1], flame.xforms[1].post
+
+    def test_setters(self):
+        for name, pair in (('xp', 'x'), ('yp', 'y'), ('op', 'o')):
+            for xform in self.xforms():
+                setattr(xform, name, (2., 90.))
+                self.assertEqual(getattr(xform, name), (2., 90.))
+                self.assertEqual(getattr(xform, pair), rect((2., 90.)))
+
+    def test_polars(self):
+        value = ((1., 10.), (2., 100.), (0.5, -45.))
+        for xform in self.xforms():
+            xform.polars = value
+            self.assertEqual(xform.polars, value)
+            self.assertEqual(xform.o, rect((0.5, -45.)))
+
+
+class ChaosTest(unittest.TestCase):
+    def test_default(self):
+        flame = Flame(make_flame(xforms=3, lfos=0))
+        flame.xforms.append(flame.xforms[0].copy())
+        chaos = Chaos(flame.xforms[0])
+        self.assertEqual(chaos.value, (1,) * 4)
+        self.assertFalse(chaos.isactive())
+        flame.xforms[0].chaos = chaos
+        self.assertEqual(flame.xforms[0].to_element().get('chaos'), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import gc
+import sys
+import unittest
+
+from bench import make_flame
+from flame import Flame
+from instrument import profile
+
+
+class ProfileTest(unittest.TestCase):
+    def test_counts_allocations(self):
+        flame = Flame(make_flame(xforms=3, lfos=2))
+        with profile() as p:
+            for n in xrange(5):
+                flame.get_at(n / 5.)
+        self.assertEqual(p.totals['frame']['calls'], 5)
+        if not hasattr(sys, 'getallocatedblocks'):
+            self.assertIsNone(p.totals['frame']['blocks'])
+            return
+        #every frame builds a tree of new elements
+        self.assertTrue(p.totals['frame']['blocks'] > 0)
+        for frame in p.frames:
+            self.assertTrue(frame['stages']['frame']['blocks'] > 0)
+
+    def test_leaves_collector_alone(self):
+        #flames sit in reference cycles, only the collector frees them
+        enabled = gc.isenabled()
+        gc.enable()
+        try:
+            with profile():
+                self.assertTrue(gc.isenabled())
+                Flame(make_flame()).get_at(0.5)
+            self.assertTrue(gc.isenabled())
+        finally:
+            if not enabled:
+                gc.disable()
+
+
+if __name__ == '__main__':
+    unittest.main()
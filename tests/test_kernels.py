@@ -0,0 +1,22 @@
+import unittest
+
+import kernels
+from variations import variation_list, variations
+
+
+class KernelTest(unittest.TestCase):
+    def test_registry_is_complete(self):
+        missing = [name for name in variation_list
+                   if variations[name] not in kernels.kernels]
+        self.assertEqual(missing, [])
+
+    def test_batched_matches_scalar(self):
+        for var_id in sorted(kernels.kernels):
+            worst = kernels.verify(var_id)
+            #nan means only one of the two versions gave a finite point
+            self.assertTrue(worst < 1e-9, '{0}: {1}'.format(
+                            variation_list[var_id], worst))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import xml.etree.cElementTree as ET
+
+from flame import Flame
+from keyframes import Keyframes
+
+KEYS = '''<flames>
+  <flame name="a" time="0" size="64 64" center="0 0" scale="20"
+      brightness="4" gamma="4">
+    <xform weight="0.5" color="0" coefs="0.9 0.2 -0.3 0.8 0.1 0"
+        julian="1" julian_power="3" julian_dist="1" />
+    <xform weight="0.5" color="1" coefs="0.5 0 0 0.5 -0.1 0" linear="1" />
+    <color index="0" rgb="255 0 0" />
+    <color index="1" rgb="0 0 255" />
+  </flame>
+  <flame name="b" time="1" size="64 64" center="0 0" scale="20"
+      brightness="4" gamma="4">
+    <xform weight="0.7" color="0.5" coefs="0.3 -0.6 0.4 0.7 0 0.2"
+        julian="1" julian_power="5" julian_dist="1" />
+    <xform weight="0.5" color="1" coefs="0.5 0 0 0.5 -0.1 0" linear="1"
+        post="0.8 0.1 0 0.8 0 0" />
+    <color index="0" rgb="0 255 0" />
+    <color index="1" rgb="0 0 255" />
+  </flame>
+</flames>'''
+
+
+class KeyframesTest(unittest.TestCase):
+    def flames(self, mode):
+        flames = [Flame(element)
+                  for element in ET.fromstring(KEYS).findall('flame')]
+        for flame in flames:
+            flame.interpolation_type = mode
+        return flames
+
+    def test_frames_on_keys_are_the_keys(self):
+        for mode in ('linear', 'log', 'polar'):
+            flames = self.flames(mode)
+            frames = [flame.to_string()
+                      for flame in Keyframes(flames).iter_flames(5)]
+            self.assertEqual(frames[0], flames[0].to_string(), mode)
+
+    def test_last_frame_has_the_last_key_values(self):
+        #name and time are never interpolated, see keyframes.FIXED
+        flames = self.flames('log')
+        frame = list(Keyframes(flames).iter_flames(5))[-1]
+        self.assertEqual([xform.to_string() for xform in frame.xforms],
+                         [xform.to_string() for xform in flames[1].xforms])
+        self.assertEqual(frame.palette.array.tolist(),
+                         flames[1].palette.array.tolist())
+
+    def test_unused_variables_stay_unset(self):
+        for frame in Keyframes(self.flames('log')).iter_flames(5):
+            self.assertFalse('julian_power' in frame.xforms[1].__dict__)
+
+
+if __name__ == '__main__':
+    unittest.main()
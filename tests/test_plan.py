@@ -0,0 +1,151 @@
+import unittest
+import xml.etree.cElementTree as ET
+
+import flame as flame_module
+from bench import make_flame
+from flame import Flame
+from utils import print_loop
+
+FLAME = '''<flame name="plan" size="64 64" center="0 0" scale="20"
+    brightness="4" gamma="4">
+  <xform weight="0.5" color="0" coefs="0.9 0.2 -0.3 0.8 0.1 0" linear="1">
+    <lfo target="rotate" shape="sin" freq="1" amp="30" phase="0" />
+    <lfo target="weight" shape="triangle" freq="2" amp="0.25" phase="0.5" />
+  </xform>
+  <xform weight="0.5" color="1" coefs="0.5 0 0 0.5 -0.1 0" spherical="0.5"
+      post="1 0 0 1 0.25 0">
+    <lfo target="porbit" shape="square" freq="1" amp="45" phase="0" />
+  </xform>
+  <color index="0" rgb="255 0 0" />
+  <color index="1" rgb="0 0 255" />
+</flame>'''
+
+
+def set_coefs(flame):
+    flame.xforms[0].coefs = (0.5, 0.25, -0.25, 0.5, 0.125, 0.)
+
+def set_weight(flame):
+    flame.xforms[1].weight = 3.
+
+def set_post(flame):
+    flame.xforms[0].add_post((0.5, 0., 0., 0.5, 0., 0.))
+
+def set_lfo(flame):
+    flame.xforms[0].lfos[0].amp = 90.
+
+def set_brightness(flame):
+    flame.brightness = 2.
+
+def deleted_brightness(flame):
+    del flame.brightness
+
+def deleted_variation(flame):
+    xform = flame.xforms[1]
+    delattr(xform, xform.list_vars()[0])
+
+def set_color(flame):
+    flame.palette.colors[1].rgb = (1., 2., 3.)
+
+def set_name(flame):
+    flame.name = 'renamed'
+
+def reversed_xforms(flame):
+    flame.xforms.reverse()
+
+def popped_xform(flame):
+    flame.xforms.pop(1)
+
+def appended_xform(flame):
+    flame.xforms.append(flame.xforms[0].copy())
+
+def popped_lfo(flame):
+    flame.xforms[0].lfos.pop()
+
+def painted_color(flame):
+    flame.palette.array[0] = (7, 7, 7)
+
+
+class GetAtTest(unittest.TestCase):
+    #get_at reflects the flame as it is now, edits need no compile
+    edits = (set_coefs, set_weight, set_post, set_lfo, set_brightness,
+             deleted_brightness, deleted_variation, set_color)
+
+    def test_edits(self):
+        for edit in self.edits:
+            flame = Flame(ET.fromstring(FLAME))
+            flame.get_at(0.)
+            edit(flame)
+            fresh = Flame(ET.fromstring(flame.to_string()))
+            for i in (0., 0.25, 0.7):
+                self.assertEqual(ET.tostring(flame.get_at(i, 10.)),
+                                 ET.tostring(fresh.get_at(i, 10.)),
+                                 edit.__name__)
+
+
+class XformGetAtTest(unittest.TestCase):
+    def test_uses_flame_plan(self):
+        flame = Flame(ET.fromstring(FLAME))
+        flame.compile()
+        original = flame_module.XformPlan
+        #nothing may be compiled per call
+        flame_module.XformPlan = None
+        try:
+            for i in (0., 0.25, 0.7):
+                frame = flame.get_at(i)
+                for j, xform in enumerate(flame.xforms):
+                    self.assertEqual(ET.tostring(xform.get_at(i)),
+                                     ET.tostring(frame[j]))
+        finally:
+            flame_module.XformPlan = original
+
+    def test_follows_edits(self):
+        flame = Flame(ET.fromstring(FLAME))
+        flame.xforms[0].get_at(0.)
+        set_lfo(flame)
+        fresh = Flame(ET.fromstring(flame.to_string()))
+        self.assertEqual(ET.tostring(flame.xforms[0].get_at(0.3)),
+                         ET.tostring(fresh.xforms[0].get_at(0.3)))
+
+    def test_detached(self):
+        flame = Flame(ET.fromstring(FLAME))
+        xform = flame.xforms[0].copy()
+        self.assertEqual(ET.tostring(xform.get_at(0.3)),
+                         ET.tostring(flame.xforms[0].get_at(0.3)))
+
+
+class PlanTest(unittest.TestCase):
+    #Edits made after a first export have to show up in the next one, the
+    #same as in a flame parsed from scratch, in place edits included
+    edits = GetAtTest.edits + (set_name, reversed_xforms, popped_xform,
+                               appended_xform, popped_lfo, painted_color)
+
+    def check(self, edit, memoize):
+        flame = Flame(make_flame(xforms=3, lfos=2))
+        flame.compile(memoize)
+        print_loop(flame, 5)
+        edit(flame)
+        fresh = Flame(ET.fromstring(flame.to_string()))
+        self.assertEqual(print_loop(flame, 5), print_loop(fresh, 5),
+                         edit.__name__)
+        self.assertEqual(ET.tostring(flame.get_at(0.3)),
+                         ET.tostring(fresh.get_at(0.3)), edit.__name__)
+
+    def test_edits(self):
+        for edit in self.edits:
+            self.check(edit, False)
+
+    def test_edits_memoized(self):
+        for edit in self.edits:
+            self.check(edit, True)
+
+    def test_edits_after_edits(self):
+        flame = Flame(make_flame(xforms=3, lfos=2))
+        for edit in self.edits:
+            print_loop(flame, 3)
+            edit(flame)
+        fresh = Flame(ET.fromstring(flame.to_string()))
+        self.assertEqual(print_loop(flame, 5), print_loop(fresh, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
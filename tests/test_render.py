@@ -0,0 +1,90 @@
+import unittest
+import xml.etree.cElementTree as ET
+
+import numpy as np
+
+from flame import Flame
+import render
+from render import Renderer, render_parallel
+
+FLAME = '''<flame name="jump" size="16 16" center="0 0" scale="4" quality="1"
+    brightness="4" gamma="4">
+  <xform weight="0.5" color="0" coefs="0.5 0 0 0.5 0.1 0" julian="1"
+      julian_power="3" julian_dist="1" />
+  <xform weight="0.5" color="1" coefs="0.5 0 0 0.5 -0.1 0" linear="1" />
+  <color index="0" rgb="255 0 0" />
+  <color index="1" rgb="0 0 255" />
+</flame>'''
+
+
+class CarryTest(unittest.TestCase):
+    def renderer(self, **attributes):
+        flame = Flame(ET.fromstring(FLAME))
+        for name, value in attributes.iteritems():
+            setattr(flame.xforms[0], name, value)
+        renderer = Renderer(flame, seed=0, batch=100)
+        return renderer
+
+    def test_carries_small_changes(self):
+        previous = self.renderer()
+        previous.iterate(100)
+        self.assertTrue(self.renderer(julian_power=3.01).carry(previous))
+
+    def test_variable_jump_resets(self):
+        previous = self.renderer()
+        previous.iterate(100)
+        self.assertFalse(self.renderer(julian_power=7.).carry(previous))
+
+    def test_weight_jump_resets(self):
+        previous = self.renderer()
+        previous.iterate(100)
+        self.assertFalse(self.renderer(weight=0.).carry(previous))
+
+
+class LoopTest(unittest.TestCase):
+    def carried(self, lfo):
+        #Frames of a 30 frame loop that started from the previous frame's
+        #points
+        flame = Flame(ET.fromstring(FLAME.replace(
+                'julian_dist="1" />', 'julian_dist="1">%s</xform>' % lfo)))
+        carried = []
+        carry = Renderer.carry
+        def recording(renderer, other, jump=render.JUMP):
+            rtn = carry(renderer, other, jump)
+            carried.append(rtn)
+            return rtn
+        Renderer.carry = recording
+        try:
+            for image in render.render_loop(flame, 30, samples=200, seed=0):
+                pass
+        finally:
+            Renderer.carry = carry
+        return carried
+
+    def test_smooth_loop_carries(self):
+        #12 degrees of rotation a frame is far more than JUMP
+        self.assertEqual(self.carried(
+                '<lfo target="julian_power" shape="sin" freq="1" amp="4" />'),
+                [True] * 29)
+
+    def test_square_edge_resets(self):
+        carried = self.carried('<lfo target="julian_power" shape="square" '
+                               'freq="1" amp="4" phase="0" />')
+        self.assertEqual(carried, [True] * 14 + [False] + [True] * 14)
+
+
+class ParallelTest(unittest.TestCase):
+    def test_reproducible(self):
+        flame = Flame(ET.fromstring(FLAME))
+        first = render_parallel(flame, samples=5000, seed=5, workers=2)
+        self.assertTrue(first.any())
+        self.assertTrue(np.array_equal(
+                render_parallel(flame, samples=5000, seed=5, workers=2),
+                first))
+        self.assertFalse(np.array_equal(
+                render_parallel(flame, samples=5000, seed=6, workers=2),
+                first))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import StringIO
+import unittest
+import xml.etree.cElementTree as ET
+
+from bench import make_flame
+from flame import Flame
+from utils import (frame_at, frame_string, iter_frames, iter_loop, print_loop,
+                   write_loop)
+
+
+class LoopTest(unittest.TestCase):
+    def setUp(self):
+        self.flame = Flame(make_flame(xforms=3, lfos=2))
+
+    def test_writers_agree(self):
+        loop = print_loop(self.flame, 6)
+        self.assertEqual(''.join(iter_loop(self.flame, 6)), loop)
+        f = StringIO.StringIO()
+        write_loop(self.flame, f, 6)
+        self.assertEqual(f.getvalue(), loop)
+        self.assertEqual(loop, '<flames>{0}</flames>'.format(''.join(
+                         ET.tostring(frame_at(self.flame, n, 6))
+                         for n in xrange(6))))
+
+    def test_frames_leave_flame_alone(self):
+        before = self.flame.to_string()
+        print_loop(self.flame, 6)
+        self.assertEqual(self.flame.to_string(), before)
+
+    def test_parallel_matches_serial(self):
+        serial = print_loop(self.flame, 12)
+        for workers in (2, 3, 5):
+            self.assertEqual(print_loop(self.flame, 12, workers=workers),
+                             serial)
+
+    def test_parallel_is_lazy(self):
+        frames = iter_frames(self.flame, 1000, workers=2)
+        self.assertEqual(next(frames), frame_string(self.flame, 0, 1000))
+        frames.close()
+
+    def test_no_frames(self):
+        for workers in (None, 2):
+            self.assertEqual(print_loop(self.flame, 0, workers=workers),
+                             '<flames></flames>')
+
+
+if __name__ == '__main__':
+    unittest.main()
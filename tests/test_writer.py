@@ -0,0 +1,41 @@
+import unittest
+import xml.etree.cElementTree as ET
+
+from bench import make_flame, make_flames
+from flame import Flame, Flames
+
+
+def flame(seed=0, **kwargs):
+    element = make_flame(seed=seed, **kwargs)
+    #a name that needs escaping
+    element.set('name', 'a&b <"c">\n')
+    return Flame(element)
+
+
+class WriterTest(unittest.TestCase):
+    def test_flame(self):
+        for seed in xrange(5):
+            f = flame(seed, xforms=4, lfos=2)
+            self.assertEqual(f.to_string(), ET.tostring(f.to_element()))
+
+    def test_flames(self):
+        flames = Flames(make_flames(3, xforms=2))
+        self.assertEqual(flames.to_string(), ET.tostring(flames.to_element()))
+
+    def test_xforms(self):
+        f = flame(1, xforms=3, lfos=2)
+        for xform in f.xforms:
+            self.assertEqual(xform.to_string(),
+                             ET.tostring(xform.to_element()))
+
+    def test_frames(self):
+        for seed in xrange(5):
+            f = flame(seed, xforms=3, lfos=2)
+            for n in xrange(10):
+                i, rotate = n / 10., 36. * (n + 1)
+                self.assertEqual(f.string_at(i, rotate),
+                                 ET.tostring(f.get_at(i, rotate)))
+
+
+if __name__ == '__main__':
+    unittest.main()
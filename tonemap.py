@@ -0,0 +1,105 @@
+import math
+import numpy as np
+from utils import rgb_to_hsv, hsv_to_rgb
+
+#output rows and columns handled at a time
+TILE = 256
+#how far out, in filter radii, the spatial filter reaches
+FILTER_CUTOFF = 1.8
+
+
+def tonemap(flame, histogram, samples, bits=8, tile=TILE, out=None):
+    #Turns an rgba accumulation histogram of size * oversample into a
+    #size image of 8 or 16 bit rgba. The histogram is only ever read a tile
+    #at a time, so it can be a memmap, and the float temporaries are all
+    #tile sized. out can be a preallocated image, a memmap for instance.
+    oversample = int(getattr(flame, 'oversample', 1))
+    height = histogram.shape[0] // oversample
+    width = histogram.shape[1] // oversample
+    if out is None:
+        out = np.empty((height, width, 4),
+                       dtype=np.uint8 if bits == 8 else np.uint16)
+    image = out
+    #log density scaling, k2 makes a uniform coverage come out at 1
+    k1 = float(flame.brightness)
+    k2 = histogram.shape[0] * histogram.shape[1] / float(max(samples, 1))
+    radius = oversample * float(getattr(flame, 'filter', 0.))
+    for top in xrange(0, height, tile):
+        rows = _filter(top, min(top + tile, height), oversample, radius,
+                       histogram.shape[0])
+        for left in xrange(0, width, tile):
+            columns = _filter(left, min(left + tile, width), oversample,
+                              radius, histogram.shape[1])
+            block = np.array(histogram[rows[1]:rows[2], columns[1]:columns[2]],
+                             dtype=float)
+            density = block[..., 3]
+            with np.errstate(all='ignore'):
+                ls = np.where(density > 0,
+                              k1 * np.log1p(density * k2) / density, 0.)
+            block *= ls[..., None]
+            #filter and downsample in one go, per channel
+            pixels = np.tensordot(rows[0], block, axes=(1, 0))
+            pixels = np.tensordot(pixels, columns[0], axes=(1, 1))
+            pixels = pixels.transpose(0, 2, 1)
+            image[top:top + len(rows[0]), left:left + len(columns[0])] = (
+                    _finish(flame, pixels, bits))
+    return image
+
+def _filter(start, stop, oversample, radius, size):
+    #Weights taking histogram rows (or columns) to output rows start..stop,
+    #along with the range of histogram rows they read.
+    centers = (np.arange(start, stop) + 0.5) * oversample - 0.5
+    if radius > 0:
+        reach = int(math.ceil(FILTER_CUTOFF * radius))
+    else:
+        reach = 0
+    first = max(int(math.floor(centers[0])) - reach - oversample, 0)
+    last = min(int(math.ceil(centers[-1])) + reach + oversample + 1, size)
+    taps = np.arange(first, last)
+    d = taps[None, :] - centers[:, None]
+    if radius > 0:
+        weights = np.exp(-2. * (d / radius) ** 2)
+        weights[np.abs(d) > FILTER_CUTOFF * radius] = 0.
+    else:
+        #plain box average of each output pixel's oversample buckets
+        weights = (np.abs(d) < oversample / 2.).astype(float)
+    weights /= np.maximum(weights.sum(1), 1e-300)[:, None]
+    return weights, first, last
+
+def _finish(flame, pixels, bits):
+    #gamma, vibrancy, highlight power and background for filtered pixels
+    g = 1. / flame.gamma
+    linrange = float(getattr(flame, 'gamma_threshold', 0.))
+    vibrancy = float(getattr(flame, 'vibrancy', 1.))
+    highpow = float(getattr(flame, 'highlight_power', -1.))
+    alpha = pixels[..., 3]
+    with np.errstate(all='ignore'):
+        gamma = alpha ** g
+        if linrange > 0:
+            #linear below the threshold so low densities don't blow up
+            frac = alpha / linrange
+            gamma = np.where(alpha < linrange,
+                             (1. - frac) * alpha * linrange ** (g - 1.) +
+                             frac * gamma, gamma)
+        ls = np.where(alpha > 0, vibrancy * gamma / alpha, 0.)
+        rgb = (ls[..., None] * pixels[..., :3] +
+               (1. - vibrancy) * np.maximum(pixels[..., :3], 0.) ** g)
+    if highpow >= 0:
+        #scale blown out colors back into range and desaturate them by how
+        #far out they were
+        peak = rgb.max(-1)
+        over = peak > 1.
+        if over.any():
+            scale = 1. / peak[over]
+            hsv = rgb_to_hsv(rgb[over] * scale[:, None])
+            hsv[:, 1] *= scale ** highpow
+            rgb[over] = hsv_to_rgb(hsv)
+    alpha = np.clip(gamma, 0., 1.)
+    background = np.asarray(getattr(flame, 'background', (0., 0., 0.)),
+                            dtype=float)
+    rgb = np.clip(rgb, 0., 1.) + (1. - alpha[..., None]) * background
+    maxval = 255. if bits == 8 else 65535.
+    rtn = np.empty(pixels.shape)
+    rtn[..., :3] = np.clip(rgb, 0., 1.) * maxval
+    rtn[..., 3] = alpha * maxval
+    return np.rint(rtn)
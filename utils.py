@@ -1,20 +1,90 @@
+import collections
+import itertools
 import math
-import xml.etree.cElementTree as ET
+import numpy as np
+import multiprocessing
 
 NFRAMES = 30
+#frames a worker process of iter_frames serializes per task
+CHUNK = 4
 
 def normalize(val, max_val=1):
     x = val/float(max_val)
     return (x - math.floor(x)) * max_val
 
-def print_loop(flame, nframes=NFRAMES):
-    element = ET.Element('flames')
-    for i in xrange(nframes):
-        for xform in flame.xforms:
-            if xform.animate:
-                xform.rot(360/float(nframes))
-        element.append(flame.get_at(i/float(nframes)))
-    return ET.tostring(element)
+def normalize_array(val, max_val=1):
+    x = np.asarray(val, dtype=float) / max_val
+    return (x - np.floor(x)) * max_val
+
+def print_loop(flame, nframes=NFRAMES, workers=None, cache=None):
+    return ''.join(iter_loop(flame, nframes, workers, cache))
+
+def write_loop(flame, f, nframes=NFRAMES, workers=None, cache=None):
+    #Writes each frame to the file object f as soon as it's generated
+    for chunk in iter_loop(flame, nframes, workers, cache):
+        f.write(chunk)
+
+def iter_loop(flame, nframes=NFRAMES, workers=None, cache=None):
+    #Yields the <flames> document piece by piece, one frame at a time, so
+    #only a single frame is ever held in memory.
+    yield '<flames>'
+    for frame in iter_frames(flame, nframes, workers, cache):
+        yield frame
+    yield '</flames>'
+
+def iter_frames(flame, nframes=NFRAMES, workers=None, cache=None):
+    #Yields every serialized frame of the loop in order. With workers the
+    #frames are serialized by that many worker processes, workers=0 uses one
+    #process per cpu. Each worker is sent the flame once and then asked for
+    #CHUNK frames at a time, and no more than 2 * workers chunks are ever
+    #waiting, so memory stays bounded however long the loop is. cache is a
+    #cache.FrameCache frames are looked up in and added to.
+    if workers is None or workers == 1 or nframes <= 0:
+        for n in xrange(nframes):
+            yield frame_string(flame, n, nframes, cache)
+        return
+    if workers == 0:
+        workers = multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(workers, initializer=_init_frames,
+                                initargs=(flame, nframes, cache))
+    try:
+        starts = iter(xrange(0, nframes, CHUNK))
+        pending = collections.deque()
+        while True:
+            for start in itertools.islice(starts, 2 * workers - len(pending)):
+                pending.append(pool.apply_async(_frames, (start,)))
+            if not pending:
+                return
+            for frame in pending.popleft().get():
+                yield frame
+    finally:
+        pool.terminate()
+        pool.join()
+
+def frame_at(flame, n, nframes=NFRAMES):
+    #Frame n of a loop. Animated xforms have turned (n+1)/nframes of a
+    #full rotation, the flame itself is left untouched.
+    return flame.get_at(n/float(nframes), rotate=360.*(n+1)/nframes)
+
+def frame_string(flame, n, nframes=NFRAMES, cache=None):
+    #frame_at serialized, written out directly
+    i, rotate = n/float(nframes), 360.*(n+1)/nframes
+    if cache is not None:
+        return cache.string_at(flame, i, rotate)
+    return flame.string_at(i, rotate)
+
+#set in each worker process by _init_frames
+_loop = {}
+
+def _init_frames(flame, nframes, cache):
+    _loop['flame'] = flame
+    _loop['nframes'] = nframes
+    _loop['cache'] = cache
+
+def _frames(start):
+    nframes = _loop['nframes']
+    return [frame_string(_loop['flame'], n, nframes, _loop['cache'])
+            for n in xrange(start, min(start + CHUNK, nframes))]
 
 def polar(coord):
     x, y = coord
@@ -27,3 +97,49 @@ def rect(coord):
     x = l * math.cos(t*math.pi/180.)
     y = l * math.sin(t*math.pi/180.)
     return x, y
+
+def rgb_to_hsv(rgb):
+    #Vectorized colorsys.rgb_to_hsv over the last axis of rgb
+    rgb = np.asarray(rgb, dtype=float)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(-1)
+    minc = rgb.min(-1)
+    delta = maxc - minc
+    hsv = np.zeros_like(rgb)
+    hsv[..., 2] = maxc
+    nonzero = delta > 0
+    hsv[..., 1] = np.where(nonzero, delta / np.where(maxc > 0, maxc, 1), 0.)
+    d = np.where(nonzero, delta, 1)
+    rc, gc, bc = (maxc - r) / d, (maxc - g) / d, (maxc - b) / d
+    h = np.where(r == maxc, bc - gc,
+                 np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    hsv[..., 0] = np.where(nonzero, (h / 6.0) % 1.0, 0.)
+    return hsv
+
+def hsv_to_rgb(hsv):
+    #Vectorized colorsys.hsv_to_rgb over the last axis of hsv
+    hsv = np.asarray(hsv, dtype=float)
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(int) % 6
+    choices = (
+            (v, t, p),
+            (q, v, p),
+            (p, v, t),
+            (p, q, v),
+            (t, p, v),
+            (v, p, q),
+            )
+    rgb = np.empty_like(hsv)
+    for channel in xrange(3):
+        rgb[..., channel] = np.choose(i, [c[channel] for c in choices])
+    return rgb
+
+def rect_array(l, t):
+    #Vectorized rect, t in degrees
+    t = np.radians(t)
+    return l * np.cos(t), l * np.sin(t)
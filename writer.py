@@ -0,0 +1,123 @@
+#Writes flam3 XML text directly instead of building ElementTree nodes just to
+#flatten them. Output is byte for byte what ET.tostring gives for the same
+#elements: attributes sorted by name, ET's attribute escaping and ' />' for
+#empty elements.
+
+#what ET.tostring encodes to by default
+ENCODING = 'us-ascii'
+COEFS = "{0} {1} {2} {3} {4} {5}".format
+
+
+def format_coefs(c):
+    #coefs and post are written with str.format, unlike other values
+    return COEFS(*c)
+
+def format_value(v):
+    #Attribute values as written to flam3 XML: whole floats lose their
+    #fractional part and sequences are space-delimited.
+    if isinstance(v, basestring):
+        return v
+    elif hasattr(v, "__iter__"):
+        return " ".join(str(i if i % 1 else int(i)) for i in v)
+    else:
+        return str(v if v % 1 else int(v))
+
+def escape(text):
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    if "\"" in text:
+        text = text.replace("\"", "&quot;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    return text.encode(ENCODING, "xmlcharrefreplace")
+
+def attribute(k, text):
+    return ' {0}="{1}"'.format(k, escape(text))
+
+def attributes(attrib):
+    #attrib maps names to already formatted values
+    return ''.join(attribute(k, attrib[k]) for k in sorted(attrib))
+
+def tag(name, attrib, children=''):
+    if children:
+        return '<{0}{1}>{2}</{0}>'.format(name, attributes(attrib), children)
+    return '<{0}{1} />'.format(name, attributes(attrib))
+
+def flames_string(flames):
+    return tag('flames', {}, ''.join(flame_string(flame)
+                                     for flame in flames.iter_flames()))
+
+def flame_string(flame):
+    attrib = dict((k, format_value(v)) for k, v in flame._iter_attributes())
+    children = [xform_string(xform) for xform in flame.xforms]
+    if flame.final:
+        children.append(xform_string(flame.final))
+    children.append(palette_string(flame.palette))
+    return tag('flame', attrib, ''.join(children))
+
+def xform_string(xform, print_lfos=True):
+    attrib = xform_attrib(xform)
+    children = ''
+    if xform.lfos and print_lfos:
+        children = ''.join(lfo_string(lfo) for lfo in xform.lfos
+                           if lfo.isactive())
+    return tag(xform_tag(xform), attrib, children)
+
+def xform_tag(xform):
+    return 'finalxform' if xform.isfinal() else 'xform'
+
+def xform_attrib(xform):
+    #Formatted attributes of xform as Xform.to_element writes them
+    attrib = {'coefs': format_coefs(xform.coefs)}
+    if xform.post:
+        attrib['post'] = xform.post.to_string()
+    if xform.chaos and xform.chaos.isactive():
+        attrib['chaos'] = xform.chaos.to_string()
+    for k, v in xform._iter_attributes():
+        attrib[k] = format_value(v)
+    return attrib
+
+def lfo_string(lfo):
+    return tag('lfo', dict((k, format_value(getattr(lfo, k)))
+                           for k in lfo._defaults))
+
+def palette_string(palette):
+    return ''.join('<color index="{0}" rgb="{1}" />'.format(
+                   i, format_value(rgb))
+                   for i, rgb in enumerate(palette.array.tolist()))
+
+
+class XformWriter(object):
+    #Precompiled serializer for the frames of one xform. The attributes are
+    #laid out in sorted order once, those that never change already written
+    #out, so a frame only formats the values its XformPlan computed.
+    def __init__(self, xform, keys=()):
+        attrib = xform_attrib(xform)
+        self.head = '<' + xform_tag(xform)
+        #(name, prefix, written value or None, formatter) in sorted order
+        self.slots = []
+        for k in sorted(set(attrib) | set(keys) | set(['post'])):
+            if k in attrib:
+                static = attribute(k, attrib[k])
+            else:
+                static = None
+            if k in ('coefs', 'post'):
+                formatter = format_coefs
+            else:
+                formatter = format_value
+            self.slots.append((k, ' {0}="'.format(k), static, formatter))
+
+    def write(self, values):
+        #The <xform /> for per-frame values as produced by an XformPlan
+        parts = [self.head]
+        for k, prefix, static, formatter in self.slots:
+            if k in values:
+                parts.extend((prefix, escape(formatter(values[k])), '"'))
+            elif static is not None:
+                parts.append(static)
+        parts.append(' />')
+        return ''.join(parts)